@@ -0,0 +1,79 @@
+"""Compares POST /users with and without USERS_GROUP_COMMIT.
+
+Creates the same number of users from the same number of threads once
+per mode, counting the transactions committed on the engine, and reports
+throughput, commits per second and users per commit next to the usual
+latency figures. Threads stand in for a gthread or gevent worker; a sync
+worker never has concurrent calls to batch.
+
+Usage: python -m benchmarks.bench_group_commit [--database URL]
+           [--requests 2000] [--concurrency 16] [--max-wait 0.002]
+"""
+
+import argparse
+import json
+import time
+
+from sqlalchemy import event
+
+from src import create_app, db
+from src.api.users.models import User
+
+from .run import DEFAULT_DATABASE, run_scenario
+
+
+def run_mode(app, args, group_commit: bool) -> dict:
+    app.config["USERS_GROUP_COMMIT"] = group_commit
+    app.extensions.pop("batchers", None)
+    prefix = f"group-{int(time.time())}-{int(group_commit)}"
+
+    def post_user(i):
+        body = {"username": f"group{i}", "email": f"{prefix}-{i}@example.com"}
+        return "POST", "/users", body
+
+    commits = []
+
+    def on_commit(conn):
+        commits.append(1)
+
+    event.listen(db.engine, "commit", on_commit)
+    try:
+        result = run_scenario(app, post_user, args.requests, args.concurrency)
+    finally:
+        event.remove(db.engine, "commit", on_commit)
+
+    result["group_commit"] = group_commit
+    result["commits"] = len(commits)
+    result["commits_per_s"] = len(commits) / result["seconds"]
+    result["users_per_commit"] = args.requests / max(len(commits), 1)
+    return result
+
+
+def run(args) -> list[dict]:
+    app = create_app()
+    app.config.from_object("src.config.TestingConfig")
+    app.config["SQLALCHEMY_DATABASE_URI"] = args.database
+    app.config["GROUP_COMMIT_MAX_SIZE"] = args.max_size
+    app.config["GROUP_COMMIT_MAX_WAIT"] = args.max_wait
+
+    with app.app_context():
+        db.create_all()
+        results = [run_mode(app, args, mode) for mode in (False, True)]
+        db.session.query(User).filter(User.email.like("group-%")).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--database", default=DEFAULT_DATABASE)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-size", type=int, default=100)
+    parser.add_argument("--max-wait", type=float, default=0.002)
+    args = parser.parse_args()
+    print(json.dumps(run(args), indent=2))
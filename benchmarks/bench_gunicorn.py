@@ -0,0 +1,124 @@
+"""Compares gunicorn with and without preload_app (Linux only).
+
+Starts gunicorn with gunicorn.conf.py once per mode against the same
+database, drives GET /users from a few threads, then reads RSS and PSS
+of the master and workers from /proc. PSS splits shared pages between
+the processes sharing them, so it shows what copy-on-write saves.
+
+Usage: python -m benchmarks.bench_gunicorn [--database URL] [--workers 4]
+           [--seconds 10] [--concurrency 8]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from .run import DEFAULT_DATABASE, percentile
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/ping")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("gunicorn did not start")
+
+
+def process_tree(pid: int) -> list[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [pid, *(int(child) for child in f.read().split())]
+
+
+def memory_mb(pid: int) -> dict:
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                usage[key.lower()] = int(value.split()[0]) / 1024
+    return usage
+
+
+def load(port: int, seconds: float, concurrency: int) -> dict:
+    latencies = []
+    deadline = time.monotonic() + seconds
+
+    def worker():
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            conn.request("GET", "/users?limit=100")
+            conn.getresponse().read()
+            latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / seconds,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def run_mode(args, preload: bool) -> dict:
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(args.workers),
+        GUNICORN_PRELOAD="true" if preload else "false",
+        APP_SETTINGS="src.config.TestingConfig",
+        DATABASE_TEST_URL=args.database,
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "wsgi:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(port)
+        result = {"preload": preload, "workers": args.workers}
+        result.update(load(port, args.seconds, args.concurrency))
+        processes = [memory_mb(pid) for pid in process_tree(proc.pid)]
+        result["rss_mb"] = sum(p["rss"] for p in processes)
+        result["pss_mb"] = sum(p["pss"] for p in processes)
+        return result
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--database", default=DEFAULT_DATABASE)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    results = [run_mode(args, preload) for preload in (False, True)]
+    print(json.dumps(results, indent=2))
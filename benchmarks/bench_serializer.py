@@ -0,0 +1,70 @@
+"""Compares the compiled user serializer with flask-restx marshalling.
+
+Usage: python -m benchmarks.bench_serializer [--sizes 1 1000 100000]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from flask_restx import marshal
+
+from src.api.users.models import User
+from src.api.users.views import serialize_user, user
+
+
+def make_users(count: int) -> list[User]:
+    start = datetime(2021, 1, 1)
+    users = []
+    for i in range(count):
+        obj = User(username=f"user{i}", email=f"user{i}@example.com")
+        obj.id = i + 1
+        obj.created_date = start + timedelta(seconds=i)
+        users.append(obj)
+    return users
+
+
+def dump_marshal(users: list[User]) -> str:
+    return json.dumps(marshal(users, user))
+
+
+def dump_compiled(users: list[User]) -> str:
+    return json.dumps([serialize_user(u) for u in users])
+
+
+def best_of(func, min_time: float = 0.5, min_runs: int = 3) -> float:
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_runs or time.perf_counter() < started + min_time:
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def run(sizes: list[int]) -> list[dict]:
+    results = []
+    for size in sizes:
+        users = make_users(size)
+        assert dump_compiled(users) == dump_marshal(users), "output differs"
+
+        marshal_s = best_of(lambda: dump_marshal(users))
+        compiled_s = best_of(lambda: dump_compiled(users))
+        results.append(
+            {
+                "users": size,
+                "marshal_s": marshal_s,
+                "compiled_s": compiled_s,
+                "speedup": marshal_s / compiled_s,
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    sizes = [1, 1000, 100000]
+    parser.add_argument("--sizes", type=int, nargs="+", default=sizes)
+    args = parser.parse_args()
+    print(json.dumps(run(args.sizes), indent=2))
@@ -0,0 +1,62 @@
+"""Compares compiled payload validation with flask-restx's jsonschema path.
+
+Validates a valid and an invalid user payload the way Resource does for
+expect(user, validate=True), once through flask_restx.Model.validate
+and once through CompiledModel.validate, inside a request context.
+
+Usage: python -m benchmarks.bench_validation [--iterations 20000]
+"""
+
+import argparse
+import json
+import time
+
+from flask_restx import Model
+from werkzeug.exceptions import BadRequest
+
+from src import create_app
+from src.api import api
+from src.api.users.views import user
+
+PAYLOADS = {
+    "valid": {"username": "bench", "email": "bench@example.com"},
+    "invalid": {"username": "bench", "email": 1},
+}
+
+
+def time_validate(validate, payload: dict, iterations: int) -> float:
+    """Returns the mean seconds per call, errors included."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        try:
+            validate(payload, api.refresolver, api.format_checker)
+        except BadRequest:
+            pass
+    return (time.perf_counter() - started) / iterations
+
+
+def run(iterations: int) -> list[dict]:
+    app = create_app()
+    results = []
+    with app.test_request_context():
+        for name, payload in PAYLOADS.items():
+            jsonschema_s = time_validate(
+                lambda *args: Model.validate(user, *args), payload, iterations
+            )
+            compiled_s = time_validate(user.validate, payload, iterations)
+            results.append(
+                {
+                    "payload": name,
+                    "jsonschema_us": jsonschema_s * 1e6,
+                    "compiled_us": compiled_s * 1e6,
+                    "speedup": jsonschema_s / compiled_s,
+                }
+            )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.iterations), indent=2))
@@ -0,0 +1,42 @@
+"""Compares two benchmarks.run reports scenario by scenario.
+
+Usage: python -m benchmarks.compare BASE.json HEAD.json [--threshold 0.1]
+
+Exits with status 1 when any scenario's p95 latency grew, or its
+throughput dropped, by more than the threshold.
+"""
+
+import argparse
+import json
+import sys
+
+
+def compare(base: dict, head: dict, threshold: float) -> list[dict]:
+    rows = []
+    for name, after in head["results"].items():
+        before = base["results"].get(name)
+        if before is None:
+            continue
+        p95 = after["p95_ms"] / before["p95_ms"]
+        throughput = after["throughput_rps"] / before["throughput_rps"]
+        rows.append(
+            {
+                "scenario": name,
+                "p95_ratio": p95,
+                "throughput_ratio": throughput,
+                "regressed": p95 > 1 + threshold or throughput < 1 - threshold,
+            }
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("base", type=argparse.FileType())
+    parser.add_argument("head", type=argparse.FileType())
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    rows = compare(json.load(args.base), json.load(args.head), args.threshold)
+    print(json.dumps(rows, indent=2))
+    sys.exit(any(row["regressed"] for row in rows))
@@ -0,0 +1,198 @@
+"""Load-tests every API endpoint through the WSGI app and reports JSON.
+
+Each scenario sends a fixed number of requests from a fixed number of
+threads and reports latency percentiles, throughput and peak RSS, so
+runs on two commits can be compared with benchmarks.compare. The delete
+scenario removes the users created by earlier post scenarios.
+
+Usage: python -m benchmarks.run [--database URL] [--users 10000]
+           [--requests 2000] [--concurrency 8] [--output FILE]
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from src import create_app, db
+from src.api.users.models import User
+from src.api.users.seed import seed_users
+
+DEFAULT_DATABASE = "sqlite:////tmp/benchmark.sqlite3"
+
+# A scenario maps a request index to (method, path, json body).
+Scenario = Callable[[int], tuple[str, str, Optional[dict]]]
+
+
+def make_scenarios(user_ids: list[int], seed: int) -> dict[str, Scenario]:
+    rng = random.Random(seed)
+    run_id = int(time.time())
+
+    def ping(i):
+        return "GET", "/ping", None
+
+    def list_users(i):
+        return "GET", "/users?limit=100", None
+
+    def get_user(i):
+        return "GET", f"/users/{rng.choice(user_ids)}", None
+
+    def post_user(i):
+        email = f"bench-{run_id}-{i}@example.com"
+        return "POST", "/users", {"username": f"bench{i}", "email": email}
+
+    def put_user(i):
+        user_id = rng.choice(user_ids)
+        body = {"username": f"renamed{i}", "email": f"user{user_id}@x.org"}
+        return "PUT", f"/users/{user_id}", body
+
+    return {
+        "ping": ping,
+        "list": list_users,
+        "get": get_user,
+        "post": post_user,
+        "put": put_user,
+    }
+
+
+def delete_scenario() -> tuple[Scenario, int]:
+    """Deletes the users created by post scenarios, one per request."""
+    query = db.session.query(User.id).filter(User.email.like("bench-%"))
+    ids = [user_id for user_id, in query]
+
+    def delete_user(i):
+        return "DELETE", f"/users/{ids[i]}", None
+
+    return delete_user, len(ids)
+
+
+def percentile(latencies: list[float], pct: int) -> float:
+    if len(latencies) < 2:
+        return latencies[0] if latencies else 0.0
+    return statistics.quantiles(latencies, n=100)[pct - 1]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_scenario(app, scenario: Scenario, requests: int, concurrency: int):
+    counter = itertools.count()
+    latencies, errors = [], []
+
+    def worker():
+        client = app.test_client()
+        while True:
+            i = next(counter)
+            if i >= requests:
+                return
+            method, path, body = scenario(i)
+            started = time.perf_counter()
+            resp = client.open(path, method=method, json=body)
+            latencies.append(time.perf_counter() - started)
+            if resp.status_code >= 400:
+                errors.append(resp.status_code)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "errors": len(errors),
+        "seconds": elapsed,
+        "throughput_rps": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args) -> dict:
+    app = create_app()
+    app.config.from_object("src.config.TestingConfig")
+    app.config["SQLALCHEMY_DATABASE_URI"] = args.database
+
+    results = {}
+    with app.app_context():
+        db.create_all()
+        missing = args.users - db.session.query(User).count()
+        if missing > 0:
+            seed_users(missing, seed=args.seed)
+        user_ids = [user_id for user_id, in db.session.query(User.id)]
+        scenarios = make_scenarios(user_ids, args.seed)
+        dialect = db.engine.dialect.name
+        db.session.remove()
+
+        for name in args.scenarios:
+            requests = args.requests
+            if name == "delete":
+                scenario, available = delete_scenario()
+                requests = min(requests, available)
+                db.session.remove()
+            else:
+                scenario = scenarios[name]
+            concurrency = args.concurrency
+            results[name] = run_scenario(app, scenario, requests, concurrency)
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "database": dialect,
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    scenarios = ["ping", "list", "get", "post", "put", "delete"]
+    parser.add_argument("--database", default=DEFAULT_DATABASE)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=scenarios,
+        default=scenarios,
+    )
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Measures the cold-start cost of the app in a fresh interpreter.
+
+Reports the time to import src and to run create_app(), the resulting
+RSS, and the slowest imports by cumulative time (from -X importtime),
+using the APP_SETTINGS and FLASK_ENV of the calling environment.
+
+Usage: python -m benchmarks.startup [--top 20]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+from src import create_app
+imported = time.perf_counter()
+create_app()
+created = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "create_app_s": created - imported,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "admin_loaded": "flask_admin" in sys.modules,
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """Parses lines like 'import time: self [us] | cumulative | name'."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        imports.append(
+            {
+                "module": name.strip(),
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+    return imports
+
+
+def report(top: int = 20) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(proc.stdout.splitlines()[-1])
+    imports = parse_importtime(proc.stderr)
+    imports.sort(key=lambda item: item["cumulative_ms"], reverse=True)
+    result["slowest_imports"] = imports[:top]
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(report(args.top), indent=2))
@@ -0,0 +1,117 @@
+"""Gunicorn settings, read from the environment.
+
+GUNICORN_WORKER_CLASS picks sync (default), gthread or gevent (which
+needs the gevent package), and the worker count defaults to what suits
+that class on the CPUs the container may use, up to GUNICORN_MAX_WORKERS
+(8). WEB_CONCURRENCY and GUNICORN_THREADS override the sizing.
+"""
+
+import gc
+import math
+import os
+import shutil
+
+# Each worker has its own DB pool (DB_POOL_SIZE + DB_MAX_OVERFLOW) and
+# cache, so the default stays well under PostgreSQL's max_connections.
+MAX_DEFAULT_WORKERS = int(os.getenv("GUNICORN_MAX_WORKERS", "8"))
+
+
+def cgroup_cpu_limit(root: str = "/sys/fs/cgroup") -> float:
+    """Returns the container's CPU quota, or inf if there is none."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>".
+        with open(os.path.join(root, "cpu.max")) as f:
+            quota, period = f.read().split()
+        if quota == "max":
+            return math.inf
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: a quota of -1 means unlimited.
+        with open(os.path.join(root, "cpu", "cpu.cfs_quota_us")) as f:
+            quota = int(f.read())
+        with open(os.path.join(root, "cpu", "cpu.cfs_period_us")) as f:
+            period = int(f.read())
+    except (OSError, ValueError):
+        return math.inf
+    return quota / period if quota > 0 else math.inf
+
+
+def available_cpus(root: str = "/sys/fs/cgroup") -> int:
+    """Counts the CPUs this process may run on, within its cgroup quota.
+
+    cpu_count() reports the host's CPUs, however few a container gets.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover (not Linux)
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit(root)
+    if limit < cpus:
+        cpus = max(1, math.ceil(limit))
+    return cpus
+
+
+cpus = available_cpus()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+default_threads = 1
+if worker_class == "gthread":
+    default_workers, default_threads = cpus + 1, 4
+elif worker_class == "gevent":
+    default_workers = cpus
+    worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "100"))
+else:
+    default_workers = 2 * cpus + 1
+default_workers = min(default_workers, MAX_DEFAULT_WORKERS)
+workers = int(os.getenv("WEB_CONCURRENCY", default_workers))
+threads = int(os.getenv("GUNICORN_THREADS", default_threads))
+
+# Import the app once in the master so workers share its pages. gevent
+# patches the stdlib after the fork, too late for a preloaded app.
+default_preload = "false" if worker_class == "gevent" else "true"
+preload_app = os.getenv("GUNICORN_PRELOAD", default_preload) == "true"
+
+# Recycle workers to bound slow leaks, staggered so they do not all
+# restart at once.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+
+def on_starting(server):
+    # Samples left by a previous master would be aggregated into /metrics.
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def pre_fork(server, worker):
+    # Objects in the permanent generation are skipped by the collector,
+    # so it does not touch (and copy) the pages inherited from the master.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    from src import db
+
+    # Connections opened while preloading belong to the master; drop them
+    # from this worker's pool without closing the master's sockets.
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
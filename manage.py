@@ -1,9 +1,14 @@
+import json
+
+import click
+from flask import current_app
 from flask.cli import FlaskGroup
 
 from src import create_app, db
+from src.api import api
 from src.api.users.models import User  # noqa: F401
+from src.api.users.seed import seed_users as insert_synthetic_users
 
-app = create_app()
 cli = FlaskGroup(create_app=create_app)
 
 
@@ -21,5 +26,34 @@ def seed_db():
     db.session.commit()
 
 
+@cli.command("seed_users")
+@click.argument("count", type=int)
+@click.option("--batch-size", default=10000, show_default=True)
+@click.option("--seed", default=0, show_default=True)
+def seed_users(count, batch_size, seed):
+    """Inserts COUNT synthetic users with bulk inserts."""
+    insert_synthetic_users(count, batch_size=batch_size, seed=seed)
+
+
+@cli.command("startup_report")
+@click.option("--top", default=20, show_default=True)
+def startup_report(top):
+    """Prints import and create_app() cost of a cold start as JSON."""
+    # Dev-only tooling; the other commands must not depend on benchmarks/.
+    from benchmarks import startup
+
+    click.echo(json.dumps(startup.report(top), indent=2))
+
+
+@cli.command("write_spec")
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+def write_spec(path):
+    """Writes swagger.json to PATH, to be served as a static file."""
+    with current_app.test_request_context():
+        body, _ = api.serialized_spec()
+    with open(path, "wb") as f:
+        f.write(body)
+
+
 if __name__ == "__main__":
     cli()
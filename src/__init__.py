@@ -1,12 +1,19 @@
 import os
 
 from flask import Flask
-from flask_admin import Admin
-from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from src import compression, metrics, replicas
+from src.pool import PooledSQLAlchemy
 
-admin = Admin(template_mode="bootstrap3")
+db = PooledSQLAlchemy()
+
+
+def is_enabled(app: Flask, key: str) -> bool:
+    """Reads an optional feature flag; unset means all but production."""
+    value = app.config.get(key)
+    if value is None:
+        return os.getenv("FLASK_ENV") != "production"
+    return value
 
 
 def create_app(script_info=None):
@@ -16,13 +23,20 @@ def create_app(script_info=None):
     app.config.from_object(app_settings)
 
     db.init_app(app)
+    # Registered first so its after_request hook sees compressed sizes.
+    metrics.init_app(app)
+    compression.init_app(app)
+    replicas.init_app(app)
+
+    # Flask-Admin and its WTForms stack are only imported when enabled.
+    if is_enabled(app, "ADMIN_ENABLED"):
+        from src import admin
 
-    if os.getenv("FLASK_ENV") != "production":
         admin.init_app(app)
 
     from src.api import api
 
-    api.init_app(app)
+    api.init_app(app, add_specs=is_enabled(app, "API_DOCS_ENABLED"))
 
     @app.shell_context_processor
     def ctx():
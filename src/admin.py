@@ -0,0 +1,11 @@
+from flask import Flask
+from flask_admin import Admin
+
+from src import db
+from src.api.users.admin import UsersAdminView
+from src.api.users.models import User
+
+
+def init_app(app: Flask) -> None:
+    admin = Admin(app, template_mode="bootstrap3")
+    admin.add_view(UsersAdminView(User, db.session))
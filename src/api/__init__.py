@@ -1,9 +1,10 @@
-from flask_restx import Api
-
 from src.api.ping import ping_namespace
+from src.api.spec import SpecApi
+from src.api.stats import stats_namespace
 from src.api.users.views import users_namespace
 
-api = Api(version="1.0", title="Users API", doc="/doc")
+api = SpecApi(version="1.0", title="Users API", doc="/doc")
 
 api.add_namespace(ping_namespace, path="/ping")
 api.add_namespace(users_namespace, path="/users")
+api.add_namespace(stats_namespace, path="/stats")
@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import Callable
+
+from flask_restx import fields, marshal
+from flask_restx.fields import is_indexable_but_not_string
+from flask_restx.marshalling import make
+
+# Field types whose format() is inlined; anything else keeps the model on
+# the regular marshal() path. {v} is the value, {f} the field's format().
+INLINE_FORMATS = {
+    fields.Integer: "int({v})",
+    fields.String: "str({v})",
+    fields.Boolean: "bool({v})",
+    fields.Float: "float({v})",
+    fields.DateTime: "{v}.isoformat() if type({v}) is datetime else {f}({v})",
+}
+
+OUTPUT_LINE = "        {key!r}: default{i} if v{i} is None else ({inline}),"
+
+
+def _is_compilable(key: str, field) -> bool:
+    field_type = type(field)
+    if field_type not in INLINE_FORMATS or hasattr(dict, key):
+        return False
+    if field.attribute is not None or field.mask is not None:
+        return False
+    if callable(field.default):
+        return False
+    if field_type is fields.DateTime and field.dt_format != "iso8601":
+        return False
+    return key.isidentifier()
+
+
+def compile_model(model) -> Callable:
+    """Compiles model into a function producing what marshal() would.
+
+    The function reads attributes (or dict keys) directly and inlines the
+    formatting of the basic field types. Objects it cannot handle, and
+    any formatting error, are passed to marshal() so the output and the
+    error messages match exactly.
+    """
+    resolved = {key: make(field) for key, field in model.resolved.items()}
+    if getattr(model, "__mask__", None) or not all(
+        _is_compilable(key, field) for key, field in resolved.items()
+    ):
+        return lambda obj: marshal(obj, model)
+
+    namespace = {
+        "datetime": datetime,
+        "indexable": is_indexable_but_not_string,
+        "fallback": lambda obj: marshal(obj, model),
+    }
+    from_dict, from_attrs, output = [], [], []
+    for i, (key, field) in enumerate(resolved.items()):
+        default = field.default
+        if default:
+            default = field.format(default)
+        namespace[f"format{i}"] = field.format
+        namespace[f"default{i}"] = default
+        inline = INLINE_FORMATS[type(field)].format(v=f"v{i}", f=f"format{i}")
+        from_dict.append(f"        v{i} = obj.get({key!r})")
+        from_attrs.append(f"        v{i} = getattr(obj, {key!r}, None)")
+        output.append(OUTPUT_LINE.format(key=key, i=i, inline=inline))
+
+    source = "\n".join(
+        [
+            "def serialize(obj):",
+            "    if type(obj) is dict:",
+            *from_dict,
+            "    elif indexable(obj):",
+            "        return fallback(obj)",
+            "    else:",
+            *from_attrs,
+            "    try:",
+            "        return {",
+            *output,
+            "        }",
+            "    except Exception:",
+            "        return fallback(obj)",
+        ]
+    )
+    exec(compile(source, f"<serializer {model.name}>", "exec"), namespace)
+    return namespace["serialize"]
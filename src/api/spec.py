@@ -0,0 +1,57 @@
+import hashlib
+import json
+
+from flask import Response, current_app, request
+from flask_restx import Api
+from flask_restx.swagger import Swagger
+
+
+class SpecApi(Api):
+    """Api serving swagger.json from a copy serialized on first request.
+
+    The copy is rebuilt only when the namespaces (their paths, routes or
+    models) change, and is served with an ETag and API_SPEC_MAX_AGE.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._spec = None
+
+    def _register_specs(self, app_or_blueprint):
+        if self._add_specs:
+            rule, endpoint = "/swagger.json", "specs"
+            app_or_blueprint.add_url_rule(rule, endpoint, self.render_specs)
+            self.endpoints.add(endpoint)
+
+    def _fingerprint(self) -> tuple:
+        return tuple(
+            (
+                namespace.name,
+                self.ns_paths.get(namespace),
+                tuple(resource.urls for resource in namespace.resources),
+                tuple(namespace.models),
+            )
+            for namespace in self.namespaces
+        )
+
+    def serialized_spec(self) -> tuple[bytes, str]:
+        """Returns swagger.json and its ETag.
+
+        Needs a request context, like url_for, for the base path.
+        """
+        fingerprint = self._fingerprint()
+        spec = self._spec
+        if spec is None or spec[0] != fingerprint:
+            schema = Swagger(self).as_dict()
+            body = json.dumps(schema, separators=(",", ":")).encode()
+            etag = hashlib.sha1(body).hexdigest()
+            spec = self._spec = (fingerprint, body, etag)
+        return spec[1], spec[2]
+
+    def render_specs(self) -> Response:
+        body, etag = self.serialized_spec()
+        response = Response(body, mimetype="application/json")
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config["API_SPEC_MAX_AGE"]
+        return response.make_conditional(request)
@@ -0,0 +1,38 @@
+from functools import wraps
+
+from flask import abort, current_app
+from flask_restx import Namespace, Resource
+
+from src import is_enabled
+from src.pool import pool_stats
+from src.replicas import get_replicas
+
+
+def stats_enabled(view):
+    """Answers 404 unless STATS_ENABLED is on for this app."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_enabled(current_app, "STATS_ENABLED"):
+            abort(404)
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+stats_namespace = Namespace("stats", decorators=[stats_enabled])
+
+
+class ReplicaStats(Resource):
+    def get(self):
+        """Returns the health and lag of the read replicas."""
+        replicas = get_replicas()
+        if replicas is None:
+            return []
+        return [
+            dict(replica.stats(), pool=pool_stats(replica.engine.pool))
+            for replica in replicas.replicas
+        ]
+
+
+stats_namespace.add_resource(ReplicaStats, "/replicas")
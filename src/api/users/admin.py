@@ -1,4 +1,58 @@
-from flask_admin.contrib.sqla import ModelView
+from flask import current_app, flash
+from flask_admin.contrib.sqla import ModelView, filters
+from sqlalchemy import func, literal, or_, tuple_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Query
+
+from src.api.users import crud
+from src.api.users.models import User
+
+# SQLSTATE of a statement cancelled by statement_timeout.
+QUERY_CANCELED = "57014"
+
+
+class CountQuery(Query):
+    """COUNT(*) query that stops counting after limit rows.
+
+    Unfiltered counts use the planner's estimate once the table is larger
+    than limit, so the list view never scans the whole table to size its
+    pager.
+    """
+
+    limit_rows = None
+
+    def scalar(self):
+        if self.limit_rows is None:
+            return super().scalar()
+        if self.whereclause is None:
+            estimate = crud.estimate_user_count()
+            if estimate is not None and estimate > self.limit_rows:
+                return estimate
+        rows = self.with_entities(literal(1)).limit(self.limit_rows + 1)
+        count = self.session.query(func.count()).select_from(rows.subquery())
+        return count.scalar()
+
+
+def _lower_match(column, term: str):
+    """Matches like Flask-Admin's search terms, on the lower() indexes."""
+    term = term.lower()
+    if term.startswith("^"):
+        return column.startswith(term[1:], autoescape=True)
+    if term.startswith("="):
+        return column == term[1:]
+    return column.contains(term, autoescape=True)
+
+
+class LowerEqual(filters.FilterEqual):
+    def apply(self, query, value, alias=None):
+        column = func.lower(self.get_column(alias))
+        return query.filter(column == value.lower())
+
+
+class LowerLike(filters.FilterLike):
+    def apply(self, query, value, alias=None):
+        column = func.lower(self.get_column(alias))
+        return query.filter(column.contains(value.lower(), autoescape=True))
 
 
 class UsersAdminView(ModelView):
@@ -11,9 +65,16 @@ class UsersAdminView(ModelView):
         "email",
         "created_date",
     )
+    # Every filter and sort below is backed by an index on users.
     column_filters = (
-        "username",
-        "email",
+        LowerEqual(User.username, "Username"),
+        LowerLike(User.username, "Username"),
+        LowerEqual(User.email, "Email"),
+        LowerLike(User.email, "Email"),
+        "active",
+        filters.DateTimeGreaterFilter(User.created_date, "Created"),
+        filters.DateTimeSmallerFilter(User.created_date, "Created"),
+        filters.DateTimeBetweenFilter(User.created_date, "Created"),
     )
     column_sortable_list = (
         "username",
@@ -21,4 +82,69 @@ class UsersAdminView(ModelView):
         "active",
         "created_date",
     )
-    column_default_sort = ("created_date", True)
+    column_default_sort = [("created_date", True), ("id", True)]
+
+    def get_count_query(self):
+        query = CountQuery([func.count("*")], session=self.session)
+        query.limit_rows = current_app.config["ADMIN_COUNT_LIMIT"]
+        return query.select_from(self.model)
+
+    def _apply_search(self, query, count_query, joins, count_joins, search):
+        for term in search.split(" "):
+            if not term:
+                continue
+            match = or_(
+                _lower_match(func.lower(User.username), term),
+                _lower_match(func.lower(User.email), term),
+            )
+            query = query.filter(match)
+            if count_query is not None:
+                count_query = count_query.filter(match)
+        return query, count_query, joins, count_joins
+
+    def get_list(self, *args, **kwargs):
+        timeout = current_app.config["ADMIN_STATEMENT_TIMEOUT"]
+        crud.set_statement_timeout(timeout)
+        try:
+            return self._get_list(*args, **kwargs)
+        except OperationalError as e:
+            if getattr(e.orig, "pgcode", None) != QUERY_CANCELED:
+                raise
+            self.session.rollback()
+            flash("The query took too long. Please narrow it down.", "error")
+            return 0, []
+
+    def _get_list(
+        self,
+        page,
+        sort_column,
+        sort_desc,
+        search,
+        filters,
+        execute=True,
+        page_size=None,
+    ):
+        size = self.page_size if page_size is None else page_size
+        if sort_column is not None or not page or not size:
+            args = (page, sort_column, sort_desc, search, filters, execute)
+            return super().get_list(*args, page_size)
+
+        # Deep pages on the default sort: find the first row of the page
+        # with a narrow query the (created_date, id) index can answer, then
+        # seek to it instead of making the full query skip earlier rows.
+        count, query = super().get_list(
+            0, None, sort_desc, search, filters, False, page_size
+        )
+        query = query.limit(None)
+        key = (User.created_date, User.id)
+        first = query.with_entities(*key).offset(page * size).first()
+        if first is None:
+            return count, []
+        query = query.filter(tuple_(*key) <= tuple(first)).limit(size)
+        return count, query.all() if execute else query
+
+    def after_model_change(self, form, model, is_created):
+        crud.invalidate_user(model)
+
+    def after_model_delete(self, model):
+        crud.invalidate_user(model, deleted=True)
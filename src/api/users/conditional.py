@@ -0,0 +1,86 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from flask import Response, current_app, request
+from flask_restx.fields import get_value
+from werkzeug.http import http_date, quote_etag
+
+Validators = tuple[str, Optional[datetime]]
+
+
+def _version_etag(user) -> Optional[str]:
+    version = get_value("version", user)
+    if version is None:
+        return None
+    return f"{get_value('id', user)}-{version}"
+
+
+def _mask_etag(etag: str) -> str:
+    """Gives bodies masked with X-Fields an ETag of their own."""
+    mask = request.headers.get(current_app.config["RESTX_MASK_HEADER"])
+    if not mask:
+        return etag
+    return f"{etag}-{hashlib.sha1(mask.encode()).hexdigest()[:12]}"
+
+
+def user_validators(user) -> Optional[Validators]:
+    """Returns (etag, last_modified) for a user, row or mapping."""
+    etag = _version_etag(user)
+    if etag is None:
+        return None
+    return _mask_etag(etag), get_value("updated_at", user)
+
+
+def page_validators(users: Iterable) -> Optional[Validators]:
+    """Returns (etag, None) covering every user of a page.
+
+    A page has no Last-Modified: deleted rows, or rows leaving a filter,
+    change it without raising the updated_at of the rows left on it.
+    """
+    digest = hashlib.sha1()
+    for user in users:
+        etag = _version_etag(user)
+        if etag is None:
+            return None
+        digest.update(f"{etag},".encode())
+    return _mask_etag(digest.hexdigest()), None
+
+
+def is_conditional() -> bool:
+    return bool(request.if_none_match) or request.if_modified_since is not None
+
+
+def is_not_modified(validators: Optional[Validators]) -> bool:
+    """Evaluates If-None-Match, or If-Modified-Since when it is absent."""
+    if validators is None:
+        return False
+    etag, last_modified = validators
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    if since is None or last_modified is None:
+        return False
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def validator_headers(validators: Optional[Validators]) -> dict:
+    """Returns the headers of a 200 or 304 response.
+
+    ETags are weak: compression (src/compression.py) weakens them on
+    encoded bodies, and a 304 must carry the validator of the 200.
+    """
+    headers = {"Vary": current_app.config["RESTX_MASK_HEADER"]}
+    if validators is None:
+        return headers
+    etag, last_modified = validators
+    headers["ETag"] = quote_etag(etag, weak=True)
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(validators: Validators) -> Response:
+    return Response(status=304, headers=validator_headers(validators))
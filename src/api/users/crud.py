@@ -1,34 +1,596 @@
+import heapq
+import itertools
+import sys
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+from flask import current_app
+from sqlalchemy import and_, any_, bindparam, case, func, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only, make_transient_to_detached
+from sqlalchemy.sql import text
+
 from src import db
-from src.api.users.models import User
+from src.api.users.models import Timestamp, User, UserTombstone
+from src.batching import get_batcher
+from src.cache import get_cache
+from src.replicas import read_from_replica
+from src.singleflight import get_group
+
+# Stays below SQLite's default SQLITE_MAX_VARIABLE_NUMBER.
+IN_CHUNK_SIZE = 900
+
+
+class DuplicateEmailError(Exception):
+    """Raised when a write collides with the unique email index."""
+
+
+def _chunks(items: list, size: int) -> Iterator[list]:
+    for start in range(0, len(items), size):
+        end = start + size
+        yield items[start:end]
+
+
+def _filter_in(query, column, values: list) -> Iterator:
+    """Yields the rows of query whose column is one of values.
+
+    PostgreSQL receives the values as a single array parameter; other
+    dialects get IN lists chunked under their bind parameter limits.
+    """
+    if db.engine.dialect.name == "postgresql":
+        param = bindparam("values", values, type_=ARRAY(column.type))
+        yield from query.filter(column == any_(param))
+        return
+    for chunk in _chunks(values, IN_CHUNK_SIZE):
+        yield from query.filter(column.in_(chunk))
+
+
+def _commit() -> None:
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        raise DuplicateEmailError(str(e.orig)) from e
+
+
+def _id_key(user_id: int) -> str:
+    return f"user:id:{user_id}"
+
+
+def _email_key(email: str) -> str:
+    return f"user:email:{email.lower()}"
+
+
+# Names of user model fields to load; None loads every column.
+Fields = Optional[tuple[str, ...]]
+
+# Columns every read loads, for keyset cursors and cache validators.
+KEY_COLUMNS = ("id", "created_date", "version", "updated_at")
+
+
+def _columns(fields: Fields) -> tuple[str, ...]:
+    """Returns the columns to load for fields, or all of them for None."""
+    if fields is None:
+        return tuple(User.__mapper__.columns.keys())
+    return tuple(dict.fromkeys(KEY_COLUMNS + tuple(fields)))
+
+
+def _load_only(query, columns: tuple[str, ...]):
+    return query.options(load_only(*(getattr(User, c) for c in columns)))
+
+
+def _snapshot(user: User, columns: Fields = None) -> dict:
+    columns = columns or User.__mapper__.columns.keys()
+    return {key: getattr(user, key) for key in columns}
+
+
+def _detached(row: dict) -> User:
+    """Builds a read-only user from a snapshot, outside any session."""
+    user = User.__mapper__.class_manager.new_instance()
+    for key, value in row.items():
+        setattr(user, key, value)
+    make_transient_to_detached(user)
+    return user
+
 
+def _restore(row: dict) -> User:
+    """Attaches a cached row to the session without querying it."""
+    return db.session.merge(_detached(row), load=False)
 
-def get_all_users() -> list[User]:
-    return User.query.all()
 
+def _cache_user(user: User) -> None:
+    # A lagging replica can return a row the primary has since changed
+    # (and invalidated); caching it would serve it for the whole TTL.
+    if read_from_replica():
+        return
+    cache = get_cache()
+    # Versioned, so a load that raced with a write cannot replace it.
+    cache.set(_id_key(user.id), _snapshot(user), version=user.version)
+    cache.set(_email_key(user.email), user.id)
 
-def get_user_by_id(user_id: int) -> User:
-    return User.query.filter_by(id=user_id).first()
+
+# Version of the fences left by deletes; no load is newer.
+DELETED_VERSION = sys.maxsize
+
+
+def _invalidate(user_id: int, version: int, *emails: str) -> None:
+    cache = get_cache()
+    cache.invalidate(_id_key(user_id), version)
+    cache.delete(*(_email_key(email) for email in emails))
+
+
+def invalidate_user(user: User, *emails: str, deleted: bool = False) -> None:
+    """Drops cached entries for a user and any emails it used to have.
+
+    Rows older than the user's version (any row, once it is deleted) are
+    kept out of the cache until the entry would have expired.
+    """
+    version = DELETED_VERSION if deleted else user.version
+    _invalidate(user.id, version, user.email, *emails)
+
+
+def _page(
+    query,
+    limit: Optional[int] = None,
+    after: Optional[tuple[datetime, int]] = None,
+    active: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    descending: bool = False,
+):
+    """Filters query down to one page in (created_date, id) order."""
+    if active is not None:
+        query = query.filter(User.active == active)
+    if created_from is not None:
+        query = query.filter(User.created_date >= created_from)
+    if created_to is not None:
+        query = query.filter(User.created_date < created_to)
+    if after is not None:
+        key = tuple_(User.created_date, User.id)
+        query = query.filter(key < after if descending else key > after)
+
+    if descending:
+        query = query.order_by(User.created_date.desc(), User.id.desc())
+    else:
+        query = query.order_by(User.created_date, User.id)
+    return query.limit(limit)
+
+
+def get_all_users(
+    limit: Optional[int] = None,
+    after: Optional[tuple[datetime, int]] = None,
+    active: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    descending: bool = False,
+    fields: Fields = None,
+) -> list[User]:
+    """Returns users in (created_date, id) order, starting after a keyset.
+
+    With fields, only those columns (plus KEY_COLUMNS) are loaded.
+    Concurrent requests for the same page share one query; the requests
+    that did not run it get detached, read-only copies of the rows.
+    """
+    page = (limit, after, active, created_from, created_to, descending)
+    columns = _columns(fields)
+    users = []
+
+    def load() -> list[dict]:
+        query = _load_only(User.query, columns)
+        users.extend(_page(query, *page))
+        return [_snapshot(user, columns) for user in users]
+
+    rows = get_group().do(("users:page", columns, *page), load)
+    return users or [_detached(row) for row in rows]
+
+
+def get_user_versions(**page) -> list[tuple[int, int, datetime]]:
+    """Returns (id, version, updated_at) for the page get_all_users would."""
+    query = db.session.query(User.id, User.version, User.updated_at)
+    key = ("users:versions", *sorted(page.items()))
+    return get_group().do(key, _page(query, **page).all)
+
+
+def _load_user(user_id: int, fields: Fields) -> Optional[dict]:
+    query = User.query.filter_by(id=user_id)
+    if fields is not None:
+        query = _load_only(query, _columns(fields))
+    user = query.first()
+    if user is None:
+        return None
+    if fields is None:
+        # Only complete rows go to the cache.
+        _cache_user(user)
+    return _snapshot(user, _columns(fields))
+
+
+def get_user_by_id(user_id: int, fields: Fields = None) -> User:
+    """Returns a user from the cache, or loads fields (or all) of it."""
+    row = get_cache().get(_id_key(user_id))
+    if row is None:
+        # Cache misses for the same user share one query.
+        key = (_id_key(user_id), fields)
+        row = get_group().do(key, lambda: _load_user(user_id, fields))
+    if row is None:
+        return None
+    return _restore(row)
+
+
+def get_users_by_ids(user_ids: list[int]) -> dict[int, User]:
+    """Returns the users that exist among user_ids, keyed by id.
+
+    Cached users are restored; the rest are loaded with one IN (ANY on
+    PostgreSQL) query and cached.
+    """
+    users, missing = {}, []
+    cache = get_cache()
+    for user_id in dict.fromkeys(user_ids):
+        row = cache.get(_id_key(user_id))
+        if row is None:
+            missing.append(user_id)
+        else:
+            users[user_id] = _restore(row)
+
+    for user in _filter_in(User.query, User.id, missing):
+        _cache_user(user)
+        users[user.id] = user
+    return users
+
+
+def get_user_version(user_id: int) -> Optional[dict]:
+    """Returns id, version and updated_at of a user without loading it."""
+    row = get_cache().get(_id_key(user_id))
+    if row is None:
+        query = db.session.query(User.id, User.version, User.updated_at)
+        row = query.filter(User.id == user_id).first()
+    if row is None:
+        return None
+    return {key: row[key] for key in ("id", "version", "updated_at")}
 
 
 def get_user_by_email(email: str) -> User:
-    return User.query.filter_by(email=email).first()
+    # Email entries only point at an id, so a stale one is caught here.
+    user_id = get_cache().get(_email_key(email))
+    if user_id is not None:
+        user = get_user_by_id(user_id)
+        if user is not None and user.email.lower() == email.lower():
+            return user
 
+    user = User.query.filter(func.lower(User.email) == email.lower()).first()
+    if user is not None:
+        _cache_user(user)
+    return user
 
-def add_user(username: str, email: str) -> User:
+
+def _prefix_range(column, prefix: str):
+    """Matches values starting with prefix as a range an index can serve."""
+    # The upper bound bumps the last character; trailing characters at
+    # the highest code point cannot be bumped, so they are dropped first.
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return column >= prefix
+    upper = stem[:-1] + chr(ord(stem[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
+
+def search_users(query: str, limit: int) -> list[User]:
+    """Returns up to limit users whose username or email contains query.
+
+    Exact matches rank first, then username prefixes, email prefixes and
+    other substrings. PostgreSQL answers from the trigram indexes and
+    breaks ties by similarity; queries shorter than a trigram match
+    prefixes only. Other dialects look up prefixes by range and only
+    scan the table for substrings when prefixes do not fill the page.
+    """
+    term = query.lower()
+    username = func.lower(User.username, type_=User.username.type)
+    email = func.lower(User.email, type_=User.email.type)
+    rank = case(
+        (or_(username == term, email == term), 0),
+        (username.startswith(term, autoescape=True), 1),
+        (email.startswith(term, autoescape=True), 2),
+        else_=3,
+    )
+
+    if db.engine.dialect.name == "postgresql":
+        if len(term) < 3:
+            match = or_(
+                username.startswith(term, autoescape=True),
+                email.startswith(term, autoescape=True),
+            )
+        else:
+            match = or_(
+                username.contains(term, autoescape=True),
+                email.contains(term, autoescape=True),
+            )
+        similarity = func.greatest(
+            func.similarity(username, term), func.similarity(email, term)
+        )
+        return (
+            User.query.filter(match)
+            .order_by(rank, similarity.desc(), User.id)
+            .limit(limit)
+            .all()
+        )
+
+    prefix = or_(_prefix_range(username, term), _prefix_range(email, term))
+    users = (
+        User.query.filter(prefix)
+        .order_by(rank, func.length(User.username), User.id)
+        .limit(limit)
+        .all()
+    )
+    if len(users) < limit:
+        substring = or_(
+            username.contains(term, autoescape=True),
+            email.contains(term, autoescape=True),
+        )
+        users += (
+            User.query.filter(substring, ~prefix)
+            .order_by(User.id)
+            .limit(limit - len(users))
+            .all()
+        )
+    return users
+
+
+# (changed_at, id, user); user is None for a deletion.
+Change = tuple[datetime, int, Optional[User]]
+
+
+# Start of the oldest transaction that has written on the primary, in
+# the session time zone like the stamps.
+OLDEST_WRITE_QUERY = text(
+    "SELECT min(xact_start)::timestamp FROM pg_stat_activity"
+    " WHERE backend_xid IS NOT NULL AND datname = current_database()"
+)
+
+
+def oldest_write_start() -> Optional[datetime]:
+    """Returns when the oldest open write transaction began, if known.
+
+    Asked of the primary, even in requests reading from a replica; None
+    on dialects other than PostgreSQL or when no write is in progress.
+    """
+    if db.engine.dialect.name != "postgresql":
+        return None
+    with db.engine.connect() as connection:
+        return connection.execute(OLDEST_WRITE_QUERY).scalar()
+
+
+def changes_cutoff(delay: float) -> datetime:
+    """Returns the latest stamp the change feed may read up to.
+
+    Writes are stamped with their transaction's start time but only show
+    up at commit, so the cutoff stays before the oldest transaction still
+    writing, however long it runs. delay seconds are kept as well, for
+    transactions that read before their first write (they only have an
+    xid from then on) and for replica lag; on other dialects it is all
+    there is.
+    """
+    now = db.session.query(func.now(type_=Timestamp)).scalar()
+    # PostgreSQL stores now() in the session's time zone, without it.
+    cutoff = now.replace(tzinfo=None) - timedelta(seconds=delay)
+    oldest = oldest_write_start()
+    if oldest is not None:
+        cutoff = min(cutoff, oldest - timedelta(microseconds=1))
+    return cutoff
+
+
+def get_user_changes(
+    after: Optional[tuple[datetime, int]], limit: int, until: datetime
+) -> list[Change]:
+    """Returns up to limit users created, updated or deleted after a keyset.
+
+    Changes come in (changed_at, id) order up to until. Each side is read
+    in key order off its own index, so this costs O(limit) rather than a
+    scan of users, however long ago the keyset is.
+    """
+    updated = User.query.filter(User.updated_at <= until)
+    deleted = db.session.query(UserTombstone.deleted_at, UserTombstone.id)
+    deleted = deleted.filter(UserTombstone.deleted_at <= until)
+    if after is not None:
+        updated = updated.filter(tuple_(User.updated_at, User.id) > after)
+        key = tuple_(UserTombstone.deleted_at, UserTombstone.id)
+        deleted = deleted.filter(key > after)
+    updated = updated.order_by(User.updated_at, User.id).limit(limit)
+    deleted = deleted.order_by(UserTombstone.deleted_at, UserTombstone.id)
+    deleted = deleted.limit(limit)
+
+    changes = heapq.merge(
+        ((user.updated_at, user.id, user) for user in updated),
+        ((deleted_at, user_id, None) for deleted_at, user_id in deleted),
+        key=lambda change: change[:2],
+    )
+    return list(itertools.islice(changes, limit))
+
+
+def estimate_user_count() -> Optional[int]:
+    """Returns the planner's row estimate, or None where there is none."""
+    if db.engine.dialect.name != "postgresql":
+        return None
+    estimate = db.session.execute(
+        "SELECT reltuples::bigint FROM pg_class WHERE oid = 'users'::regclass"
+    ).scalar()
+    # -1 (or 0 before PostgreSQL 14) means the table was never analyzed.
+    return estimate if estimate and estimate > 0 else None
+
+
+def set_statement_timeout(milliseconds: int) -> None:
+    """Bounds every statement for the rest of the current transaction."""
+    if db.engine.dialect.name == "postgresql":
+        timeout = func.set_config("statement_timeout", str(milliseconds), True)
+        db.session.execute(select(timeout))
+
+
+def get_existing_emails(emails: list[str]) -> set[str]:
+    """Returns the lower-cased emails that are already taken."""
+    column = func.lower(User.email, type_=User.email.type)
+    query = db.session.query(column)
+    lowered = list({email.lower() for email in emails})
+    return {email for (email,) in _filter_in(query, column, lowered)}
+
+
+def _add_user(username: str, email: str) -> User:
     user = User(username=username, email=email)
     db.session.add(user)
-    db.session.commit()
+    _commit()
+    invalidate_user(user)
     return user
 
 
-def update_user(user: User, username: str, email: str) -> User:
-    user.username = username
-    user.email = email
+def _try_add_user(username: str, email: str):
+    try:
+        return _detached(_snapshot(_add_user(username, email)))
+    except DuplicateEmailError as e:
+        return e
+
+
+def _add_user_batch(items: list[tuple[str, str]]) -> list:
+    """Inserts the users of concurrent add_user calls in one transaction.
+
+    Returns a detached user, or a DuplicateEmailError, per item. Taken
+    emails (including repeats within the batch) only fail their own item.
+    Should another worker insert one of the emails meanwhile, the items
+    are retried one transaction each.
+    """
+    taken = get_existing_emails([email for _, email in items])
+    results, users = [], []
+    for username, email in items:
+        if email.lower() in taken:
+            results.append(DuplicateEmailError(email))
+            continue
+        taken.add(email.lower())
+        user = User(username=username, email=email)
+        results.append(user)
+        users.append(user)
+
+    db.session.add_all(users)
+    try:
+        db.session.flush()
+        ids = [user.id for user in users]
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return [_try_add_user(*item) for item in items]
+
+    # Reloads what the commit expired in one query, not one per user.
+    list(_filter_in(User.query, User.id, ids))
+    keys = [_id_key(user_id) for user_id in ids]
+    keys += [_email_key(user.email) for user in users]
+    get_cache().delete(*keys)
+    for index, result in enumerate(results):
+        if isinstance(result, User):
+            results[index] = _detached(_snapshot(result))
+    return results
+
+
+def add_user(username: str, email: str) -> User:
+    """Adds a user; raises DuplicateEmailError if the email is taken.
+
+    With USERS_GROUP_COMMIT, calls made at the same time by the threads
+    of a worker are committed together (see _add_user_batch), and the
+    user returned is detached.
+    """
+    if not current_app.config["USERS_GROUP_COMMIT"]:
+        return _add_user(username, email)
+    batcher = get_batcher("users:add", _add_user_batch)
+    return batcher.submit((username, email))
+
+
+def add_users(users: list[dict], batch_size: int = 1000) -> list[str]:
+    """Inserts users in batches within a single transaction.
+
+    Returns a status per item: "created", or "duplicate" when the email
+    already exists or appears earlier in the same list.
+    """
+    seen = get_existing_emails([user["email"] for user in users])
+    statuses, rows = [], []
+    for user in users:
+        email = user["email"].lower()
+        if email in seen:
+            statuses.append("duplicate")
+            continue
+        seen.add(email)
+        statuses.append("created")
+        rows.append({"username": user["username"], "email": user["email"]})
+
+    # executemany lets psycopg2 fold each batch into multi-row VALUES.
+    insert = User.__table__.insert()
+    for chunk in _chunks(rows, batch_size):
+        db.session.execute(insert, chunk)
+    _commit()
+    return statuses
+
+
+def _returning(statement, fallback) -> Optional[dict]:
+    """Runs statement, returning the affected row as a dict.
+
+    Dialects without RETURNING get the row from fallback() instead, which
+    runs in the same transaction.
+    """
+    if db.engine.dialect.full_returning:
+        row = db.session.execute(statement.returning(*User.__table__.c))
+        row = row.first()
+    else:
+        row = fallback()
+    return None if row is None else dict(row._mapping)
+
+
+def update_user(user_id: int, **values) -> Optional[dict]:
+    """Updates the given columns of a user in a single statement.
+
+    Returns the updated row, or None if there is no such user.
+    """
+    table = User.__table__
+    statement = table.update().where(table.c.id == user_id).values(**values)
+
+    def fallback():
+        if db.session.execute(statement).rowcount == 0:
+            return None
+        query = table.select().where(table.c.id == user_id)
+        return db.session.execute(query).first()
+
+    try:
+        row = _returning(statement, fallback)
+    except IntegrityError as e:
+        db.session.rollback()
+        raise DuplicateEmailError(str(e.orig)) from e
     db.session.commit()
-    return user
+    if row is not None:
+        # The old email key may linger; get_user_by_email re-checks it.
+        _invalidate(user_id, row["version"], row["email"])
+    return row
+
+
+def delete_user(user_id: int) -> Optional[dict]:
+    """Deletes a user in a single statement.
+
+    Returns the deleted row, or None if there was no such user.
+    """
+    table = User.__table__
+    statement = table.delete().where(table.c.id == user_id)
 
+    def fallback():
+        query = table.select().where(table.c.id == user_id)
+        row = db.session.execute(query).first()
+        if row is not None:
+            db.session.execute(statement)
+        return row
 
-def delete_user(user: User) -> User:
-    db.session.delete(user)
+    row = _returning(statement, fallback)
     db.session.commit()
-    return user
+    if row is not None:
+        _invalidate(user_id, DELETED_VERSION, row["email"])
+    return row
+
+
+def iter_users(
+    after_id: Optional[int] = None, batch_size: int = 1000
+) -> Iterator[User]:
+    """Streams users in id order through a server-side cursor."""
+    query = User.query.order_by(User.id)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    return iter(query.yield_per(batch_size))
@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+from itertools import islice
+from typing import Iterable, Iterator
+
+from src.api.users.models import User
+
+EXPORT_FIELDS = ("id", "username", "email", "active", "created_date")
+
+MIMETYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _values(user: User) -> list:
+    return [
+        user.id,
+        user.username,
+        user.email,
+        user.active,
+        user.created_date.isoformat(),
+    ]
+
+
+def _batches(users: Iterable[User], batch_size: int) -> Iterator[list[User]]:
+    users = iter(users)
+    while True:
+        batch = list(islice(users, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def ndjson_chunks(users: Iterable[User], batch_size: int) -> Iterator[str]:
+    for batch in _batches(users, batch_size):
+        rows = (dict(zip(EXPORT_FIELDS, _values(user))) for user in batch)
+        yield "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def csv_chunks(
+    users: Iterable[User], batch_size: int, header: bool = True
+) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    for batch in _batches(users, batch_size):
+        writer.writerows(_values(user) for user in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -1,26 +1,138 @@
-import os
-
-from sqlalchemy.sql import func
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.sql import func, literal_column
 
 from src import db
 
+SQLITE_TIMESTAMP_FORMAT = (
+    "%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+)
+
+# SQLite stores CURRENT_TIMESTAMP without fractional seconds, so bind
+# parameters use the same format to keep keyset comparisons consistent.
+Timestamp = db.DateTime().with_variant(
+    sqlite.DATETIME(storage_format=SQLITE_TIMESTAMP_FORMAT), "sqlite"
+)
+
 
 class User(db.Model):
     __tablename__ = "users"
+    __table_args__ = (
+        # version and updated_at let conditional GETs on the default
+        # ordering be answered from the index alone.
+        db.Index(
+            "ix_users_created_date_id",
+            "created_date",
+            "id",
+            "version",
+            "updated_at",
+        ),
+        db.Index(
+            "ix_users_active_created_date_id",
+            "active",
+            "created_date",
+            "id",
+        ),
+        # The change feed, see crud.get_user_changes.
+        db.Index("ix_users_updated_at_id", "updated_at", "id"),
+        # Sorting in the admin list view.
+        db.Index("ix_users_username", "username"),
+        db.Index("ix_users_email", "email"),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     username = db.Column(db.String(128), nullable=False)
     email = db.Column(db.String(128), nullable=False)
     active = db.Column(db.Boolean(), default=True, nullable=False)
-    created_date = db.Column(db.DateTime, default=func.now(), nullable=False)
+    created_date = db.Column(Timestamp, default=func.now(), nullable=False)
+    updated_at = db.Column(
+        Timestamp, default=func.now(), onupdate=func.now(), nullable=False
+    )
+    version = db.Column(
+        db.Integer,
+        default=1,
+        onupdate=literal_column("version + 1"),
+        nullable=False,
+    )
 
     def __init__(self, username: str, email: str):
         self.username = username
         self.email = email
 
 
-if os.getenv("FLASK_ENV") != "production":
-    from src import admin
-    from src.api.users.admin import UsersAdminView
+class UserTombstone(db.Model):
+    """A deleted user, kept so the change feed can report the deletion.
+
+    Rows are written by a trigger on users, so every way of deleting a
+    user (the API, the admin, plain SQL) leaves one.
+    """
+
+    __tablename__ = "user_tombstones"
+    __table_args__ = (
+        db.Index(
+            "ix_user_tombstones_deleted_at_id",
+            "deleted_at",
+            "id",
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    deleted_at = db.Column(Timestamp, default=func.now(), nullable=False)
+
+
+# Emails are unique regardless of case; this also backs lookups by email.
+db.Index("ux_users_email_lower", func.lower(User.email), unique=True)
+
+
+def _on_create(when: str, statement: str, dialect: str) -> None:
+    ddl = DDL(statement).execute_if(dialect=dialect)
+    event.listen(User.__table__, when, ddl)
+
+
+# Search indexes. On PostgreSQL, trigram indexes serve both prefix and
+# substring LIKE; elsewhere crud.search_users turns prefixes into ranges
+# on expression indexes (email's is ux_users_email_lower).
+_on_create(
+    "before_create",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "postgresql",
+)
+for column in ("username", "email"):
+    _on_create(
+        "after_create",
+        f"CREATE INDEX ix_users_{column}_trgm ON users "
+        f"USING gin (lower({column}) gin_trgm_ops)",
+        "postgresql",
+    )
+_on_create(
+    "after_create",
+    "CREATE INDEX ix_users_username_lower ON users (lower(username))",
+    "sqlite",
+)
 
-    admin.add_view(UsersAdminView(User, db.session))
+# Tombstones. An id that is deleted again (SQLite may reuse ids) gets a
+# new deletion time.
+_on_create(
+    "after_create",
+    "CREATE OR REPLACE FUNCTION users_tombstone() RETURNS trigger AS $$ "
+    "BEGIN "
+    "INSERT INTO user_tombstones (id, deleted_at) VALUES (OLD.id, now()) "
+    "ON CONFLICT (id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at; "
+    "RETURN OLD; "
+    "END $$ LANGUAGE plpgsql",
+    "postgresql",
+)
+_on_create(
+    "after_create",
+    "CREATE TRIGGER users_tombstone AFTER DELETE ON users "
+    "FOR EACH ROW EXECUTE FUNCTION users_tombstone()",
+    "postgresql",
+)
+_on_create(
+    "after_create",
+    "CREATE TRIGGER users_tombstone AFTER DELETE ON users BEGIN "
+    "INSERT OR REPLACE INTO user_tombstones (id, deleted_at) "
+    "VALUES (OLD.id, CURRENT_TIMESTAMP); "
+    "END",
+    "sqlite",
+)
@@ -1,8 +1,17 @@
-from flask import request
-from flask_restx import Namespace, Resource, fields
+import json
+from functools import lru_cache
+from typing import Callable
 
-from src.api.users import crud
-from src.api.users.models import User
+from flask import Response, current_app, request, stream_with_context
+from flask_restx import Resource, fields, inputs, marshal, reqparse
+from flask_restx.model import Model
+from werkzeug.urls import url_encode
+
+from src.api.serializer import compile_model
+from src.api.users import conditional, crud, export
+from src.api.users.pagination import decode_cursor, encode_cursor
+from src.api.validation import Namespace
+from src.idempotency import idempotent
 
 users_namespace = Namespace("users")
 
@@ -17,15 +26,196 @@ user = users_namespace.model(
     },
 )
 
+serialize_user = compile_model(user)
+
+user_patch = users_namespace.model(
+    "UserPatch",
+    {"username": fields.String, "email": fields.String},
+)
+
+bulk_result = users_namespace.model(
+    "BulkResult",
+    {
+        "index": fields.Integer,
+        "email": fields.String,
+        "status": fields.String(enum=("created", "duplicate", "invalid")),
+    },
+)
+
+bulk_report = users_namespace.model(
+    "BulkReport",
+    {
+        "created": fields.Integer,
+        "duplicate": fields.Integer,
+        "invalid": fields.Integer,
+        "results": fields.List(fields.Nested(bulk_result)),
+    },
+)
+
+lookup_request = users_namespace.model(
+    "LookupRequest",
+    {"ids": fields.List(fields.Integer, required=True)},
+)
+
+lookup_result = users_namespace.model(
+    "LookupResult",
+    {
+        "users": fields.List(fields.Nested(user)),
+        "missing": fields.List(fields.Integer),
+    },
+)
+
+
+user_change = users_namespace.model(
+    "UserChange",
+    {
+        "op": fields.String(enum=("upsert", "delete")),
+        "id": fields.Integer,
+        "changed_at": fields.DateTime,
+        "user": fields.Nested(user, allow_null=True),
+    },
+)
+
+user_changes = users_namespace.model(
+    "UserChanges",
+    {
+        "changes": fields.List(fields.Nested(user_change)),
+        "cursor": fields.String,
+        "has_more": fields.Boolean,
+    },
+)
+
+
+def field_list(value: str) -> tuple[str, ...]:
+    """Parses ?fields=id,email into user model keys, in model order."""
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names - set(user)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    if not names:
+        raise ValueError("Expected at least one field")
+    return tuple(name for name in user if name in names)
+
+
+user_parser = reqparse.RequestParser()
+user_parser.add_argument("fields", type=field_list, location="args")
+
+users_parser = user_parser.copy()
+users_parser.add_argument("limit", type=inputs.positive, location="args")
+users_parser.add_argument("cursor", location="args")
+users_parser.add_argument("active", type=inputs.boolean, location="args")
+users_parser.add_argument(
+    "created_from", type=inputs.datetime_from_iso8601, location="args"
+)
+users_parser.add_argument(
+    "created_to", type=inputs.datetime_from_iso8601, location="args"
+)
+users_parser.add_argument(
+    "sort",
+    choices=("created_date", "-created_date"),
+    default="created_date",
+    location="args",
+)
+
+search_parser = reqparse.RequestParser()
+search_parser.add_argument("q", required=True, location="args")
+search_parser.add_argument("limit", type=inputs.positive, location="args")
+
+changes_parser = reqparse.RequestParser()
+changes_parser.add_argument("since", location="args")
+changes_parser.add_argument("limit", type=inputs.positive, location="args")
+
+export_parser = reqparse.RequestParser()
+export_parser.add_argument(
+    "format",
+    choices=tuple(export.MIMETYPES),
+    default="ndjson",
+    location="args",
+)
+export_parser.add_argument("after_id", type=inputs.natural, location="args")
+
+
+def load_bulk_payload() -> list:
+    """Returns the items of a JSON array or NDJSON request body."""
+    if request.mimetype == "application/x-ndjson":
+        items = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+        return items
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        users_namespace.abort(400, "Expected a JSON array or NDJSON body")
+    return data
+
+
+def is_valid_user(item) -> bool:
+    return (
+        isinstance(item, dict)
+        and isinstance(item.get("username"), str)
+        and isinstance(item.get("email"), str)
+    )
+
+
+@lru_cache(maxsize=None)
+def fields_serializer(names: tuple[str, ...]) -> Callable:
+    return compile_model(Model("User", {name: user[name] for name in names}))
+
+
+def marshal_users(data, names: tuple[str, ...] = None):
+    """Marshals one user or a list of users.
+
+    Only the given field names are output; otherwise the X-Fields mask is
+    honoured. Field names win since their columns may not be loaded.
+    """
+    serialize = serialize_user
+    if names is not None:
+        serialize = fields_serializer(names)
+    else:
+        mask = request.headers.get(current_app.config["RESTX_MASK_HEADER"])
+        if mask:
+            return marshal(data, user, mask=mask)
+    if isinstance(data, (list, tuple)):
+        return [serialize(item) for item in data]
+    return serialize(data)
+
+
+def page_size(limit) -> int:
+    limit = limit or current_app.config["USERS_PAGE_SIZE"]
+    return min(limit, current_app.config["USERS_MAX_PAGE_SIZE"])
+
+
+def next_link(cursor: str) -> str:
+    args = request.args.copy()
+    args["cursor"] = cursor
+    return f'<{request.base_url}?{url_encode(args)}>; rel="next"'
+
 
 class Users(Resource):
-    @users_namespace.marshal_with(user)
+    @users_namespace.response(200, "Success", user)
+    @users_namespace.response(304, "Not Modified")
+    @users_namespace.expect(user_parser)
     def get(self, user_id: int):
         """Returns a user."""
-        user = crud.get_user_by_id(user_id)
+        names = user_parser.parse_args()["fields"]
+        if conditional.is_conditional():
+            version = crud.get_user_version(user_id)
+            validators = conditional.user_validators(version)
+            if conditional.is_not_modified(validators):
+                return conditional.not_modified(validators)
+
+        user = crud.get_user_by_id(user_id, fields=names)
         if not user:
             users_namespace.abort(404, f"User {user_id} does not exist")
-        return user, 200
+
+        validators = conditional.user_validators(user)
+        headers = conditional.validator_headers(validators)
+        return marshal_users(user, names), 200, headers
 
     @users_namespace.expect(user, validate=True)
     def put(self, user_id: int):
@@ -35,54 +225,261 @@ class Users(Resource):
         email = data["email"]
         response = {}
 
-        user = crud.get_user_by_id(user_id)
-        if not user:
-            users_namespace.abort(404, f"User {user_id} does not exist")
-
-        if crud.get_user_by_email(email):
+        try:
+            row = crud.update_user(user_id, username=username, email=email)
+        except crud.DuplicateEmailError:
             response["message"] = "Sorry. That email already exists."
             return response, 400
+        if row is None:
+            users_namespace.abort(404, f"User {user_id} does not exist")
 
-        crud.update_user(user, username, email)
-        response["message"] = f"{user.id} was updated!"
+        response["message"] = f"{user_id} was updated!"
         return response, 200
 
+    @users_namespace.expect(user_patch, validate=True)
+    @users_namespace.response(200, "Success", user)
+    def patch(self, user_id: int):
+        """Updates some fields of a user and returns it."""
+        data = request.get_json()
+        values = {key: data[key] for key in user_patch if key in data}
+        if not values:
+            users_namespace.abort(400, "Expected username or email")
+
+        try:
+            row = crud.update_user(user_id, **values)
+        except crud.DuplicateEmailError:
+            return {"message": "Sorry. That email already exists."}, 400
+        if row is None:
+            users_namespace.abort(404, f"User {user_id} does not exist")
+
+        validators = conditional.user_validators(row)
+        headers = conditional.validator_headers(validators)
+        return marshal_users(row), 200, headers
+
     def delete(self, user_id: int):
         """Deletes a user."""
         response = {}
 
-        user = crud.get_user_by_id(user_id)
-        if user is None:
+        row = crud.delete_user(user_id)
+        if row is None:
             users_namespace.abort(404, f"User {user_id} does not exist")
 
-        crud.delete_user(user)
-        response["message"] = f"{user.email} was removed!"
+        response["message"] = f"{row['email']} was removed!"
         return response, 200
 
 
 class UsersList(Resource):
     @users_namespace.expect(user, validate=True)
+    @users_namespace.param(
+        "Idempotency-Key", "Makes retries of the request safe", _in="header"
+    )
+    @idempotent
     def post(self) -> tuple[dict, int]:
         """Creates a user."""
         data = request.get_json()
         username = data.get("username")
         email = data.get("email")
 
-        user = crud.get_user_by_email(email)
-        if user:
+        try:
+            crud.add_user(username, email)
+        except crud.DuplicateEmailError:
             response = {"message": "Sorry. That email already exists."}
             return response, 400
 
-        user = crud.add_user(username, email)
         response = {"message": f"{email} was added!"}
         return response, 201
 
-    @users_namespace.marshal_with(user, as_list=True)
-    def get(self) -> tuple[list[User], int]:
-        """Returns all users"""
-        users = crud.get_all_users()
-        return users, 200
+    @users_namespace.expect(users_parser)
+    @users_namespace.response(200, "Success", [user])
+    @users_namespace.response(304, "Not Modified")
+    def get(self):
+        """Returns a page of users"""
+        args = users_parser.parse_args()
+        limit = page_size(args["limit"])
+
+        after = None
+        if args["cursor"]:
+            try:
+                after = decode_cursor(args["cursor"])
+            except ValueError as e:
+                users_namespace.abort(400, str(e))
+
+        # Fetch one extra row to find out whether there is a next page.
+        page = dict(
+            limit=limit + 1,
+            after=after,
+            active=args["active"],
+            created_from=args["created_from"],
+            created_to=args["created_to"],
+            descending=args["sort"].startswith("-"),
+        )
+
+        if conditional.is_conditional():
+            versions = crud.get_user_versions(**page)
+            validators = conditional.page_validators(versions)
+            if conditional.is_not_modified(validators):
+                return conditional.not_modified(validators)
+
+        users = crud.get_all_users(**page, fields=args["fields"])
+        validators = conditional.page_validators(users)
+        headers = conditional.validator_headers(validators)
+
+        if len(users) > limit:
+            users = users[:limit]
+            cursor = encode_cursor(users[-1].created_date, users[-1].id)
+            headers["Link"] = next_link(cursor)
+        return marshal_users(users, args["fields"]), 200, headers
+
+
+class UsersSearch(Resource):
+    @users_namespace.expect(search_parser)
+    @users_namespace.response(200, "Success", [user])
+    def get(self):
+        """Returns the best matches for a username or email fragment"""
+        args = search_parser.parse_args()
+        query = args["q"].strip()
+        if not query:
+            users_namespace.abort(400, "Search query must not be empty")
+
+        users = crud.search_users(query, page_size(args["limit"]))
+        return marshal_users(users), 200
+
+
+class UsersLookup(Resource):
+    @users_namespace.expect(lookup_request)
+    @users_namespace.response(200, "Success", lookup_result)
+    def post(self) -> tuple[dict, int]:
+        """Returns many users by id, in the order requested."""
+        data = request.get_json(silent=True)
+        ids = data.get("ids") if isinstance(data, dict) else None
+        if not isinstance(ids, list) or not all(
+            type(user_id) is int for user_id in ids
+        ):
+            users_namespace.abort(400, "Expected a JSON list of integer ids")
+        max_ids = current_app.config["USERS_LOOKUP_MAX_IDS"]
+        if len(ids) > max_ids:
+            users_namespace.abort(400, f"At most {max_ids} ids per request")
+
+        ids = list(dict.fromkeys(ids))
+        found = crud.get_users_by_ids(ids)
+        response = {
+            "users": marshal_users([found[i] for i in ids if i in found]),
+            "missing": [i for i in ids if i not in found],
+        }
+        return response, 200
+
+
+def serialize_change(change: crud.Change) -> dict:
+    changed_at, user_id, user = change
+    return {
+        "op": "delete" if user is None else "upsert",
+        "id": user_id,
+        "changed_at": changed_at.isoformat(),
+        "user": None if user is None else serialize_user(user),
+    }
+
+
+class UsersChanges(Resource):
+    @users_namespace.expect(changes_parser)
+    @users_namespace.response(200, "Success", user_changes)
+    def get(self) -> tuple[dict, int]:
+        """Returns users created, updated or deleted since a cursor.
+
+        Pass the returned cursor as since to resume where a page ended;
+        without since, the feed starts at the beginning.
+        """
+        args = changes_parser.parse_args()
+        limit = page_size(args["limit"])
+
+        after = None
+        if args["since"]:
+            try:
+                after = decode_cursor(args["since"])
+            except ValueError as e:
+                users_namespace.abort(400, str(e))
+
+        delay = current_app.config["USERS_CHANGES_DELAY"]
+        until = crud.changes_cutoff(delay)
+        changes = crud.get_user_changes(after, limit + 1, until)
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        cursor = args["since"]
+        if changes:
+            cursor = encode_cursor(*changes[-1][:2])
+        response = {
+            "changes": [serialize_change(change) for change in changes],
+            "cursor": cursor,
+            "has_more": has_more,
+        }
+        return response, 200
+
+
+class UsersBulk(Resource):
+    @users_namespace.expect([user])
+    @users_namespace.response(200, "Success", bulk_report)
+    def post(self) -> tuple[dict, int]:
+        """Creates many users in a single transaction."""
+        items = load_bulk_payload()
+        max_items = current_app.config["USERS_BULK_MAX_ITEMS"]
+        if len(items) > max_items:
+            message = f"At most {max_items} users per request"
+            users_namespace.abort(400, message)
+
+        results = [
+            {
+                "index": index,
+                "email": item.get("email") if isinstance(item, dict) else None,
+                "status": "invalid",
+            }
+            for index, item in enumerate(items)
+        ]
+        valid = [i for i, item in enumerate(items) if is_valid_user(item)]
+        try:
+            statuses = crud.add_users(
+                [items[index] for index in valid],
+                batch_size=current_app.config["USERS_BULK_BATCH_SIZE"],
+            )
+        except crud.DuplicateEmailError:
+            # Another request inserted one of the emails after our check.
+            users_namespace.abort(409, "Sorry. That email already exists.")
+        for index, status in zip(valid, statuses):
+            results[index]["status"] = status
+
+        response = {
+            status: sum(result["status"] == status for result in results)
+            for status in ("created", "duplicate", "invalid")
+        }
+        response["results"] = results
+        return response, 200
+
+
+class UsersExport(Resource):
+    @users_namespace.expect(export_parser)
+    def get(self) -> Response:
+        """Streams all users as NDJSON or CSV"""
+        args = export_parser.parse_args()
+        after_id = args["after_id"]
+        batch_size = current_app.config["USERS_EXPORT_BATCH_SIZE"]
+
+        users = crud.iter_users(after_id=after_id, batch_size=batch_size)
+        if args["format"] == "csv":
+            header = after_id is None
+            chunks = export.csv_chunks(users, batch_size, header=header)
+        else:
+            chunks = export.ndjson_chunks(users, batch_size)
+
+        # Compressed on the fly by src.compression when the client asks.
+        return Response(
+            stream_with_context(chunks),
+            mimetype=export.MIMETYPES[args["format"]],
+        )
 
 
 users_namespace.add_resource(Users, "/<int:user_id>")
 users_namespace.add_resource(UsersList, "")
+users_namespace.add_resource(UsersSearch, "/search")
+users_namespace.add_resource(UsersLookup, "/lookup")
+users_namespace.add_resource(UsersChanges, "/changes")
+users_namespace.add_resource(UsersBulk, "/bulk")
+users_namespace.add_resource(UsersExport, "/export")
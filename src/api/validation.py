@@ -0,0 +1,142 @@
+from functools import cached_property
+from typing import Callable, Optional
+
+import flask_restx
+from flask_restx import Model
+
+# Expressions true only where Draft4Validator accepts the JSON type. They
+# may be stricter (exact types only): a payload they reject still goes
+# through jsonschema, which has the final word.
+TYPE_CHECKS = {
+    "string": "type({v}) is str",
+    "integer": "type({v}) is int",
+    "number": "type({v}) in (int, float)",
+    "boolean": "type({v}) is bool",
+    "object": "type({v}) is dict",
+    "array": "type({v}) is list",
+}
+
+# Keywords that annotate a property without constraining it. "format" is
+# only asserted with a format checker, and then nothing is compiled.
+ANNOTATIONS = {
+    "type",
+    "format",
+    "title",
+    "description",
+    "example",
+    "default",
+    "readOnly",
+}
+
+# Model-level keywords compile_validator knows.
+SCHEMA_KEYWORDS = {"type", "properties", "required", "additionalProperties"}
+
+
+def _property_check(schema: dict, v: str, constants: dict) -> Optional[str]:
+    """Returns an expression checking {v} against schema, None if unknown."""
+    kind = schema.get("type")
+    if kind not in TYPE_CHECKS:
+        return None
+    checks = [TYPE_CHECKS[kind].format(v=v)]
+    for keyword, value in schema.items():
+        if keyword in ANNOTATIONS:
+            continue
+        if keyword == "enum" and kind == "string":
+            name = f"enum{len(constants)}"
+            constants[name] = frozenset(value)
+            checks.append(f"{v} in {name}")
+        elif keyword == "minLength" and kind == "string":
+            checks.append(f"len({v}) >= {int(value)}")
+        elif keyword == "maxLength" and kind == "string":
+            checks.append(f"len({v}) <= {int(value)}")
+        elif keyword == "items" and kind == "array":
+            item = _property_check(value, "item", constants)
+            if item is None:
+                return None
+            checks.append(f"all({item} for item in {v})")
+        else:
+            return None
+    return " and ".join(f"({check})" for check in checks)
+
+
+def compile_validator(schema: dict) -> Optional[Callable[[object], bool]]:
+    """Compiles a model's JSON schema into a function of the payload.
+
+    The function returns True only for payloads Draft4Validator accepts,
+    and False for anything else it is not sure about. Returns None when
+    the schema uses keywords (references, inheritance, numeric bounds...)
+    that are not compiled.
+    """
+    if set(schema) - SCHEMA_KEYWORDS:
+        return None
+    if schema.get("type") != "object":
+        return None
+
+    constants = {}
+    lines = [
+        "def validate(data):",
+        "    if type(data) is not dict:",
+        "        return False",
+    ]
+    required = schema.get("required", [])
+    if required:
+        constants["required"] = tuple(required)
+        lines += [
+            "    for key in required:",
+            "        if key not in data:",
+            "            return False",
+        ]
+    properties = schema.get("properties", {})
+    if schema.get("additionalProperties", True) is not True:
+        if schema["additionalProperties"] is not False:
+            return None
+        constants["known"] = frozenset(properties)
+        lines += [
+            "    if not data.keys() <= known:",
+            "        return False",
+        ]
+    for i, (key, prop) in enumerate(properties.items()):
+        check = _property_check(prop, f"v{i}", constants)
+        if check is None:
+            return None
+        lines += [
+            f"    v{i} = data.get({key!r}, missing)",
+            f"    if v{i} is not missing and not ({check}):",
+            "        return False",
+        ]
+    lines.append("    return True")
+
+    namespace = dict(constants, missing=object())
+    exec(compile("\n".join(lines), "<validator>", "exec"), namespace)
+    return namespace["validate"]
+
+
+class CompiledModel(Model):
+    """Model checking payloads with a validator compiled on first use.
+
+    Payloads the compiled validator accepts skip jsonschema; the others,
+    and all payloads when a format checker is set, are validated as
+    before, so errors keep the "Input payload validation failed" shape.
+    """
+
+    @cached_property
+    def _compiled_validator(self):
+        return compile_validator(self.__schema__)
+
+    def validate(self, data, resolver=None, format_checker=None):
+        validator = self._compiled_validator
+        if format_checker is None and validator is not None:
+            if validator(data):
+                return
+        super().validate(data, resolver, format_checker)
+
+
+class Namespace(flask_restx.Namespace):
+    """Namespace whose models are CompiledModels (unless ordered)."""
+
+    def model(self, name=None, model=None, mask=None, strict=False, **kwargs):
+        if self.ordered:
+            return super().model(name, model, mask, strict, **kwargs)
+        model = CompiledModel(name, model, mask=mask, strict=strict)
+        model.__apidoc__.update(kwargs)
+        return self.add_model(name, model)
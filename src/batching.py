@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Any, Callable
+
+from flask import current_app
+
+from src.metrics import GROUP_COMMIT_BATCH_SIZE, GROUP_COMMIT_WAIT
+
+
+class _Batch:
+    def __init__(self):
+        self.values = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results = None
+
+
+class Batcher:
+    """Gathers concurrent submissions into batches run by one thread.
+
+    The first submitter of a batch waits up to max_wait seconds for others
+    to join (less once max_size values are in), then calls func with all
+    the values in its own thread. func returns one result per value; a
+    result that is an exception is raised to its submitter only. Batch
+    sizes and waits are exported under name.
+    """
+
+    def __init__(
+        self,
+        func: Callable[[list], list],
+        max_size: int,
+        max_wait: float,
+        name: str = "batch",
+    ):
+        self.func = func
+        self.name = name
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._batch = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.values = 0
+
+    def submit(self, value: Any) -> Any:
+        with self._lock:
+            batch = self._batch
+            leader = batch is None
+            if leader:
+                batch = self._batch = _Batch()
+                self.batches += 1
+            index = len(batch.values)
+            batch.values.append(value)
+            self.values += 1
+            if len(batch.values) >= self.max_size:
+                # Later submitters start the next batch.
+                self._batch = None
+                batch.full.set()
+
+        if leader:
+            start = time.perf_counter()
+            batch.full.wait(self.max_wait)
+            with self._lock:
+                if self._batch is batch:
+                    self._batch = None
+            wait = time.perf_counter() - start
+            GROUP_COMMIT_WAIT.labels(self.name).observe(wait)
+            size = len(batch.values)
+            GROUP_COMMIT_BATCH_SIZE.labels(self.name).observe(size)
+            try:
+                batch.results = self.func(batch.values)
+            except BaseException as e:
+                batch.results = [e] * len(batch.values)
+            batch.done.set()
+        else:
+            batch.done.wait()
+
+        result = batch.results[index]
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def stats(self) -> dict:
+        batches = self.batches
+        return {
+            "batches": batches,
+            "values": self.values,
+            "mean_batch_size": self.values / batches if batches else 0.0,
+        }
+
+
+def get_batcher(name: str, func: Callable[[list], list]) -> Batcher:
+    """Returns the current app's batcher for name, creating it on first use.
+
+    Batches are capped by the GROUP_COMMIT_MAX_SIZE and
+    GROUP_COMMIT_MAX_WAIT settings.
+    """
+    batchers = current_app.extensions.setdefault("batchers", {})
+    batcher = batchers.get(name)
+    if batcher is None:
+        config = current_app.config
+        batcher = batchers.setdefault(
+            name,
+            Batcher(
+                func,
+                max_size=config["GROUP_COMMIT_MAX_SIZE"],
+                max_wait=config["GROUP_COMMIT_MAX_WAIT"],
+                name=name,
+            ),
+        )
+    return batcher
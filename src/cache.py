@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Optional
+
+from flask import current_app
+
+from src.metrics import CACHE_REQUESTS
+
+
+class Cache:
+    """Bounded key/value cache with a TTL and hit/miss counters.
+
+    Subclasses implement _get, _set and _delete; get() returns None on a
+    miss, so None itself cannot be cached.
+
+    Values set with a version never replace an unexpired entry with a
+    higher one, and invalidate() leaves such an entry (a fence) without
+    a value, so a slow read that raced with a write cannot cache the row
+    from before it.
+    """
+
+    backend = "null"
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+            CACHE_REQUESTS.labels(self.backend, "miss").inc()
+        else:
+            self.hits += 1
+            CACHE_REQUESTS.labels(self.backend, "hit").inc()
+        return value
+
+    def set(self, key: str, value: Any, version: Optional[int] = None) -> None:
+        self._set(key, value, version)
+
+    def invalidate(self, key: str, version: int) -> None:
+        """Drops key, keeping out values set with an older version."""
+        self._set(key, None, version)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._delete(key)
+
+    def __len__(self) -> int:
+        return 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "size": len(self),
+            "max_size": self.size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _get(self, key: str) -> Optional[Any]:
+        return None
+
+    def _set(self, key: str, value: Any, version: Optional[int]) -> None:
+        pass
+
+    def _delete(self, key: str) -> None:
+        pass
+
+
+class MemoryCache(Cache):
+    """LRU cache local to the worker process."""
+
+    backend = "memory"
+
+    def __init__(self, size: int, ttl: float):
+        super().__init__(size, ttl)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value, _ = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Any, version: Optional[int]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if (
+                version is not None
+                and item is not None
+                and item[0] >= now
+                and item[2] is not None
+                and item[2] > version
+            ):
+                return
+            self._items[key] = (now + self.ttl, value, version)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    raise TypeError(f"Cannot cache {type(value).__name__} values")
+
+
+def _decode(item: dict) -> Any:
+    if item.keys() == {"$datetime"}:
+        return datetime.fromisoformat(item["$datetime"])
+    return item
+
+
+# Replaces an entry unless it is unexpired and of a higher version, in a
+# single statement so that the check holds across processes.
+UPSERT = (
+    "INSERT INTO entries VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE"
+    " SET value = excluded.value, version = excluded.version,"
+    " expires_at = excluded.expires_at, used_at = excluded.used_at"
+    " WHERE excluded.version IS NULL OR entries.version IS NULL"
+    " OR entries.version <= excluded.version"
+    " OR entries.expires_at < excluded.used_at"
+)
+
+
+class SQLiteCache(Cache):
+    """LRU cache in a local SQLite file shared by all workers on a host.
+
+    Values are stored as JSON (datetimes as ISO strings), never pickled,
+    so whoever can write the file cannot run code in the workers; tuples
+    come back as lists.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, size: int, ttl: float, path: str):
+        super().__init__(size, ttl)
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY,"
+            " value TEXT, version INTEGER, expires_at REAL, used_at REAL)"
+        )
+        index = "CREATE INDEX IF NOT EXISTS ix_used_at ON entries (used_at)"
+        self._db.execute(index)
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        row = self._db.execute(
+            "SELECT value FROM entries WHERE key = ? AND expires_at >= ?",
+            (key, now),
+        ).fetchone()
+        if row is None:
+            return None
+        touch = "UPDATE entries SET used_at = ? WHERE key = ?"
+        self._db.execute(touch, (now, key))
+        return json.loads(row[0], object_hook=_decode)
+
+    def _set(self, key: str, value: Any, version: Optional[int]) -> None:
+        now = time.time()
+        value = json.dumps(value, default=_encode)
+        self._db.execute(UPSERT, (key, value, version, now + self.ttl, now))
+        overflow = len(self) - self.size
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY used_at LIMIT ?)",
+                (overflow,),
+            )
+
+    def _delete(self, key: str) -> None:
+        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+
+def create_cache(config) -> Cache:
+    backend = config["CACHE_BACKEND"]
+    size, ttl = config["CACHE_SIZE"], config["CACHE_TTL"]
+    if backend == "memory":
+        return MemoryCache(size, ttl)
+    if backend == "sqlite":
+        return SQLiteCache(size, ttl, config["CACHE_PATH"])
+    if backend == "null":
+        return Cache(size, ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+def get_cache() -> Cache:
+    """Returns the cache of the current app, creating it on first use."""
+    extensions = current_app.extensions
+    if "cache" not in extensions:
+        extensions["cache"] = create_cache(current_app.config)
+    return extensions["cache"]
@@ -0,0 +1,127 @@
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import Flask, Response, current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        wbits = 16 + zlib.MAX_WBITS
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+COMPRESSORS = {"gzip": _GzipCompressor}
+if brotli is not None:
+    COMPRESSORS["br"] = _BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS["zstd"] = _ZstdCompressor
+
+
+def choose_encoding() -> Optional[str]:
+    """Picks the client's preferred encoding, ties going to config order."""
+    available = [
+        coding
+        for coding in current_app.config["COMPRESS_ALGORITHMS"]
+        if coding in COMPRESSORS
+    ]
+    return request.accept_encodings.best_match(available)
+
+
+def _compress_stream(
+    chunks: Iterable,
+    compressor,
+    charset: str,
+) -> Iterator[bytes]:
+    """Compresses a streamed body, closing the original iterable."""
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def compress_response(response: Response) -> Response:
+    config = current_app.config
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in config["COMPRESS_MIMETYPES"]
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    if not response.is_streamed:
+        if response.calculate_content_length() < config["COMPRESS_MIN_SIZE"]:
+            return response
+
+    coding = choose_encoding()
+    if coding is None:
+        return response
+    level = config["COMPRESS_LEVELS"][coding]
+    compressor = COMPRESSORS[coding](level)
+
+    if response.is_streamed:
+        response.response = _compress_stream(
+            response.response, compressor, response.charset
+        )
+        response.headers.pop("Content-Length", None)
+    else:
+        data = compressor.compress(response.get_data()) + compressor.flush()
+        response.set_data(data)
+
+    response.headers["Content-Encoding"] = coding
+    # The encoded bytes differ from the identity representation.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app: Flask) -> None:
+    app.after_request(compress_response)
@@ -1,10 +1,100 @@
 import os
+from typing import Optional
+
+
+def env_flag(name: str, default: Optional[bool] = None) -> Optional[bool]:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
 
 
 class BaseConfig:
     TESTING = False
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = "my_precious"
+    # None defers to FLASK_ENV: enabled everywhere except production.
+    ADMIN_ENABLED = env_flag("ADMIN_ENABLED")
+    # The admin list view counts exactly up to this many rows.
+    ADMIN_COUNT_LIMIT = int(os.getenv("ADMIN_COUNT_LIMIT", "10000"))
+    # Milliseconds allowed per admin list statement (PostgreSQL).
+    ADMIN_STATEMENT_TIMEOUT = int(os.getenv("ADMIN_STATEMENT_TIMEOUT", "5000"))
+    # /stats/* exposes replica hostnames; None means off in production.
+    STATS_ENABLED = env_flag("STATS_ENABLED")
+    # Swagger UI at /doc and the spec at /swagger.json, served in every
+    # environment unless turned off.
+    API_DOCS_ENABLED = env_flag("API_DOCS_ENABLED", default=True)
+    # Seconds clients may reuse swagger.json before revalidating its ETag.
+    API_SPEC_MAX_AGE = int(os.getenv("API_SPEC_MAX_AGE", "86400"))
+    USERS_PAGE_SIZE = 100
+    USERS_MAX_PAGE_SIZE = 1000
+    USERS_EXPORT_BATCH_SIZE = 1000
+    USERS_BULK_MAX_ITEMS = 50000
+    USERS_LOOKUP_MAX_IDS = 1000
+    USERS_BULK_BATCH_SIZE = 1000
+    # Commit concurrent user creations of a worker together, in batches
+    # of up to GROUP_COMMIT_MAX_SIZE gathered for GROUP_COMMIT_MAX_WAIT
+    # seconds. Only threaded or gevent workers have concurrent calls.
+    USERS_GROUP_COMMIT = env_flag("USERS_GROUP_COMMIT") or False
+    GROUP_COMMIT_MAX_SIZE = int(os.getenv("GROUP_COMMIT_MAX_SIZE", "100"))
+    GROUP_COMMIT_MAX_WAIT = float(os.getenv("GROUP_COMMIT_MAX_WAIT", "0.002"))
+    # Where Idempotency-Key responses are kept: "database" (shared by all
+    # workers) or "memory" (per worker, at most IDEMPOTENCY_MAX_KEYS).
+    IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "database")
+    IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+    IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "100000"))
+    # Seconds before the key of a request that never finished (its worker
+    # died) can be used again; a retry waits up to IDEMPOTENCY_WAIT for one
+    # that is still running.
+    IDEMPOTENCY_LOCK_TTL = float(os.getenv("IDEMPOTENCY_LOCK_TTL", "60"))
+    IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "10"))
+    # Seconds the change feed trails the clock, and at least the replica
+    # lag when reading replicas. On PostgreSQL the feed also waits for
+    # open write transactions; elsewhere this must exceed the longest one.
+    USERS_CHANGES_DELAY = float(os.getenv("USERS_CHANGES_DELAY", "5"))
+    # "memory" caches per worker process: a write only invalidates the
+    # cache of the worker that made it, and the other workers may serve
+    # the old user for up to CACHE_TTL seconds, so it only suits a single
+    # worker. "sqlite" (the production default) shares one cache between
+    # the workers of a host; "null" disables caching.
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_SIZE = int(os.getenv("CACHE_SIZE", "10000"))
+    CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+    # The directory is created private to the app's user.
+    CACHE_PATH = os.getenv("CACHE_PATH") or os.path.join(
+        os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "flask-tdd-docker",
+        "cache.sqlite3",
+    )
+    # Per worker process; size * workers must stay under max_connections.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING", default=True)
+    # Milliseconds; 0 disables the timeout.
+    DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", "30000"))
+    # Comma-separated read replica URLs; GET requests read from them.
+    SQLALCHEMY_REPLICA_URIS = [
+        url for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url
+    ]
+    # Seconds a replica may lag behind before it is skipped; None disables
+    # the check (PostgreSQL only).
+    REPLICA_MAX_LAG = os.getenv("REPLICA_MAX_LAG")
+    if REPLICA_MAX_LAG is not None:
+        REPLICA_MAX_LAG = float(REPLICA_MAX_LAG)
+    REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+    REPLICA_EJECT_SECONDS = float(os.getenv("REPLICA_EJECT_SECONDS", "30"))
+    COMPRESS_ALGORITHMS = ("br", "zstd", "gzip")
+    COMPRESS_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "500"))
+    # Static files are sent as direct passthrough and never compressed.
+    COMPRESS_MIMETYPES = (
+        "application/json",
+        "application/x-ndjson",
+        "text/csv",
+        "text/html",
+    )
 
 
 class DevelopmentConfig(BaseConfig):
@@ -22,3 +112,5 @@ class ProductionConfig(BaseConfig):
         url = url.replace("postgres://", "postgresql://", 1)
 
     SQLALCHEMY_DATABASE_URI = url
+    # gunicorn runs several workers, which must see each other's writes.
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
@@ -0,0 +1,307 @@
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from flask import Response, current_app, request
+from flask_restx import abort
+from flask_restx.utils import unpack
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from src import db
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+# Dialects whose INSERT takes ON CONFLICT DO NOTHING.
+INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# (fingerprint, saved response); the response is None while the first
+# request with the key is still running.
+Record = tuple[str, Optional[str]]
+
+
+class IdempotencyKey(db.Model):
+    __tablename__ = "idempotency_keys"
+
+    key = db.Column(db.String(MAX_KEY_LENGTH), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    # JSON [data, status, headers]; NULL while in progress.
+    response = db.Column(db.Text)
+    # Epoch seconds. A claim that is never completed expires after
+    # IDEMPOTENCY_LOCK_TTL, a saved response after IDEMPOTENCY_TTL.
+    expires_at = db.Column(db.Float, nullable=False, index=True)
+
+
+class IdempotencyStore:
+    """Saves responses by key for IDEMPOTENCY_TTL seconds.
+
+    claim() either hands the key to the caller (and returns None) or
+    returns the record of whoever has it. An unexpired key is never
+    handed out twice.
+    """
+
+    backend = "null"
+
+    def __init__(self, ttl: float, lock_timeout: float):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+
+    def claim(self, key: str, fingerprint: str) -> Optional[Record]:
+        return None
+
+    def get(self, key: str) -> Optional[Record]:
+        """Returns the unexpired record of key without claiming it."""
+        return None
+
+    def complete(self, key: str, response: str) -> None:
+        pass
+
+    def release(self, key: str) -> None:
+        """Drops an unfinished claim, so the request can be retried."""
+
+
+class MemoryStore(IdempotencyStore):
+    """LRU store local to the worker process."""
+
+    backend = "memory"
+
+    def __init__(self, ttl: float, lock_timeout: float, size: int):
+        super().__init__(ttl, lock_timeout)
+        self.size = size
+        # key -> [fingerprint, response, expires_at]
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key: str, fingerprint: str) -> Optional[Record]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[2] >= now:
+                return item[0], item[1]
+            self._items[key] = [fingerprint, None, now + self.lock_timeout]
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return None
+
+    def get(self, key: str) -> Optional[Record]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[2] < time.monotonic():
+                return None
+            return item[0], item[1]
+
+    def complete(self, key: str, response: str) -> None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                item[1] = response
+                item[2] = time.monotonic() + self.ttl
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[1] is None:
+                del self._items[key]
+
+
+class DatabaseStore(IdempotencyStore):
+    """Store in the idempotency_keys table, shared by all workers.
+
+    Every statement runs in its own short transaction on the engine, apart
+    from the request's session.
+    """
+
+    backend = "database"
+
+    # Expired keys are purged every this many claims of a worker.
+    purge_every = 100
+
+    def __init__(self, ttl: float, lock_timeout: float):
+        super().__init__(ttl, lock_timeout)
+        self._claims = 0
+
+    def claim(self, key: str, fingerprint: str) -> Optional[Record]:
+        table = IdempotencyKey.__table__
+        now = time.time()
+        values = dict(
+            fingerprint=fingerprint,
+            response=None,
+            expires_at=now + self.lock_timeout,
+        )
+        self._claims += 1
+        if self._claims % self.purge_every == 0:
+            with db.engine.begin() as conn:
+                conn.execute(table.delete().where(table.c.expires_at < now))
+
+        if self._insert(dict(key=key, **values)):
+            return None
+
+        with db.engine.begin() as conn:
+            # Take over a key that has expired but was not purged yet.
+            expired = (table.c.key == key) & (table.c.expires_at < now)
+            update = table.update().where(expired).values(**values)
+            if conn.execute(update).rowcount:
+                return None
+            query = select(table.c.fingerprint, table.c.response)
+            row = conn.execute(query.where(table.c.key == key)).first()
+        if row is None:
+            # Released or purged in the meantime.
+            return self.claim(key, fingerprint)
+        return row.fingerprint, row.response
+
+    def _insert(self, values: dict) -> bool:
+        """Inserts a key unless it exists; returns whether it did.
+
+        Where the dialect has ON CONFLICT DO NOTHING, a taken key is not
+        an error, so it leaves no failed transaction or server log line.
+        """
+        table = IdempotencyKey.__table__
+        insert = INSERTS.get(db.engine.dialect.name)
+        if insert is not None:
+            statement = insert(table).values(**values).on_conflict_do_nothing()
+            with db.engine.begin() as conn:
+                return conn.execute(statement).rowcount > 0
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(table.insert().values(**values))
+        except IntegrityError:
+            return False
+        return True
+
+    def get(self, key: str) -> Optional[Record]:
+        table = IdempotencyKey.__table__
+        query = select(table.c.fingerprint, table.c.response).where(
+            (table.c.key == key) & (table.c.expires_at >= time.time())
+        )
+        with db.engine.connect() as conn:
+            row = conn.execute(query).first()
+        return None if row is None else (row.fingerprint, row.response)
+
+    def complete(self, key: str, response: str) -> None:
+        table = IdempotencyKey.__table__
+        update = table.update().where(table.c.key == key)
+        values = dict(response=response, expires_at=time.time() + self.ttl)
+        with db.engine.begin() as conn:
+            conn.execute(update.values(**values))
+
+    def release(self, key: str) -> None:
+        table = IdempotencyKey.__table__
+        pending = (table.c.key == key) & table.c.response.is_(None)
+        with db.engine.begin() as conn:
+            conn.execute(table.delete().where(pending))
+
+
+def create_store(config) -> IdempotencyStore:
+    backend = config["IDEMPOTENCY_BACKEND"]
+    ttl = config["IDEMPOTENCY_TTL"]
+    lock_timeout = config["IDEMPOTENCY_LOCK_TTL"]
+    if backend == "database":
+        return DatabaseStore(ttl, lock_timeout)
+    if backend == "memory":
+        size = config["IDEMPOTENCY_MAX_KEYS"]
+        return MemoryStore(ttl, lock_timeout, size)
+    if backend == "null":
+        return IdempotencyStore(ttl, lock_timeout)
+    raise ValueError(f"Unknown idempotency backend: {backend}")
+
+
+def get_store() -> IdempotencyStore:
+    """Returns the store of the current app, creating it on first use."""
+    extensions = current_app.extensions
+    if "idempotency" not in extensions:
+        extensions["idempotency"] = create_store(current_app.config)
+    return extensions["idempotency"]
+
+
+def request_fingerprint() -> str:
+    digest = hashlib.sha256()
+    for part in (request.method, request.full_path):
+        digest.update(part.encode() + b"\0")
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def claim_or_wait(
+    store: IdempotencyStore,
+    key: str,
+    fingerprint: str,
+    timeout: float,
+    interval: float = 0.05,
+) -> Optional[Record]:
+    """Claims key, or waits up to timeout for its owner to finish.
+
+    Returns None once the key is ours, or the record of a finished (or
+    different) request with the key, which may still be in progress if
+    the timeout ran out.
+    """
+    deadline = time.monotonic() + timeout
+    record = store.claim(key, fingerprint)
+    # Poll with reads; claiming again is only worth it once the key has
+    # been released or has expired.
+    while record is not None and record[1] is None:
+        if record[0] != fingerprint or time.monotonic() >= deadline:
+            return record
+        time.sleep(interval)
+        record = store.get(key)
+        if record is None:
+            record = store.claim(key, fingerprint)
+    return record
+
+
+def idempotent(func: Callable) -> Callable:
+    """Lets clients retry a resource method with an Idempotency-Key header.
+
+    The first request with a key runs and its response is saved; retries
+    of the same request get the saved response (with Idempotent-Replayed)
+    without running the method again, and concurrent ones wait for it for
+    up to IDEMPOTENCY_WAIT seconds. Reusing a key for another request is
+    a 422. Exceptions and 5xx responses are not saved, so those can be
+    retried.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return func(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            abort(400, f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters")
+
+        store = get_store()
+        fingerprint = request_fingerprint()
+        timeout = current_app.config["IDEMPOTENCY_WAIT"]
+        record = claim_or_wait(store, key, fingerprint, timeout)
+        if record is not None:
+            saved_fingerprint, saved = record
+            if saved_fingerprint != fingerprint:
+                abort(422, f"{HEADER} was used for a different request")
+            if saved is None:
+                abort(409, f"A request with this {HEADER} is in progress")
+            data, status, headers = json.loads(saved)
+            headers["Idempotent-Replayed"] = "true"
+            return data, status, headers
+
+        try:
+            rv = func(*args, **kwargs)
+        except BaseException:
+            store.release(key)
+            raise
+        data, status, headers = unpack(rv)
+        try:
+            if isinstance(data, Response) or status >= 500:
+                raise TypeError("not replayable")
+            saved = json.dumps([data, status, dict(headers)])
+        except TypeError:
+            store.release(key)
+            return rv
+        store.complete(key, saved)
+        return rv
+
+    return wrapper
@@ -0,0 +1,202 @@
+import os
+import time
+
+from flask import Flask, Response, g, has_request_context, request
+from prometheus_client import Counter, Gauge, Histogram, multiprocess
+from prometheus_client.exposition import CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.registry import REGISTRY, CollectorRegistry
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request.",
+    ["method", "endpoint", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests currently being handled.",
+    ["method", "endpoint"],
+    multiprocess_mode="livesum",
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of response bodies, after compression.",
+    ["method", "endpoint"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+DB_STATEMENTS = Counter(
+    "db_statements_total",
+    "SQL statements executed while handling requests.",
+    ["endpoint"],
+)
+DB_LATENCY = Histogram(
+    "db_request_duration_seconds",
+    "Time spent in SQL statements per request.",
+    ["endpoint"],
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting to check a connection out of the pool.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up waiting for a pooled connection.",
+)
+
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total",
+    "Reads that ran their query (executed) or shared a concurrent one's"
+    " (coalesced).",
+    ["result"],
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by backend and result (hit or miss).",
+    ["backend", "result"],
+)
+
+GROUP_COMMIT_BATCH_SIZE = Histogram(
+    "group_commit_batch_size",
+    "Values per group commit batch; the count is the number of flushes.",
+    ["name"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+GROUP_COMMIT_WAIT = Histogram(
+    "group_commit_wait_seconds",
+    "Time a batch waited for values to join before it was flushed.",
+    ["name"],
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+
+def _endpoint() -> str:
+    # The rule rather than the path keeps label cardinality bounded.
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, params, context, many):
+    # Kept on the statement's context, which is dropped when it fails.
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, params, context, many):
+    start = getattr(context, "_metrics_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    if has_request_context() and "metrics_start" in g:
+        g.db_statements += 1
+        g.db_time += elapsed
+
+
+def _start_request() -> None:
+    g.pop("metrics_observed", None)
+    g.pop("metrics_streamed", None)
+    g.metrics_start = time.perf_counter()
+    g.db_statements = 0
+    g.db_time = 0.0
+    REQUESTS_IN_PROGRESS.labels(request.method, _endpoint()).inc()
+
+
+def _observe(method: str, endpoint: str, status: int, stats) -> float:
+    """Records a finished request; stats is its g, with the counters."""
+    elapsed = time.perf_counter() - stats.metrics_start
+    REQUEST_LATENCY.labels(method, endpoint, status).observe(elapsed)
+    DB_STATEMENTS.labels(endpoint).inc(stats.db_statements)
+    DB_LATENCY.labels(endpoint).observe(stats.db_time)
+    stats.metrics_observed = True
+    return elapsed
+
+
+class _MeteredStream:
+    """Wraps a streamed body, recording the request once it is sent.
+
+    The body, and the queries producing it, run after after_request; with
+    stream_with_context they still count towards the request's g, which
+    is kept here past the end of the request.
+    """
+
+    def __init__(self, response: Response):
+        self._chunks = response.response
+        self._charset = response.charset
+        self._labels = (request.method, _endpoint(), response.status_code)
+        self._stats = g._get_current_object()
+        self._size = 0
+        self._closed = False
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(self._charset)
+            self._size += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if hasattr(self._chunks, "close"):
+                self._chunks.close()
+        finally:
+            method, endpoint, status = self._labels
+            _observe(method, endpoint, status, self._stats)
+            RESPONSE_SIZE.labels(method, endpoint).observe(self._size)
+            REQUESTS_IN_PROGRESS.labels(method, endpoint).dec()
+
+
+def _record_response(response: Response) -> Response:
+    if response.is_streamed:
+        # Headers go out before the body exists, so there is no
+        # Server-Timing; the rest is recorded when the stream closes.
+        response.response = _MeteredStream(response)
+        g.metrics_streamed = True
+        return response
+
+    elapsed = _observe(request.method, _endpoint(), response.status_code, g)
+    if response.content_length is not None:
+        RESPONSE_SIZE.labels(request.method, _endpoint()).observe(
+            response.content_length
+        )
+    response.headers["Server-Timing"] = (
+        f'db;dur={g.db_time * 1000:.2f};desc="{g.db_statements} statements", '
+        f"app;dur={elapsed * 1000:.2f}"
+    )
+    return response
+
+
+def _finish_request(error) -> None:
+    if "metrics_start" not in g or "metrics_streamed" in g:
+        return
+    if "metrics_observed" not in g:
+        # after_request handlers are skipped for unhandled errors.
+        _observe(request.method, _endpoint(), 500, g)
+    REQUESTS_IN_PROGRESS.labels(request.method, _endpoint()).dec()
+
+
+def metrics() -> Response:
+    """Renders every metric in the Prometheus text format.
+
+    Under gunicorn each worker writes its samples to
+    PROMETHEUS_MULTIPROC_DIR, and they are aggregated here so any worker
+    can answer the scrape.
+    """
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app: Flask) -> None:
+    app.before_request(_start_request)
+    app.after_request(_record_response)
+    app.teardown_request(_finish_request)
+    app.add_url_rule("/metrics", "metrics", metrics)
@@ -0,0 +1,68 @@
+import time
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import exc, orm
+from sqlalchemy.pool import Pool, QueuePool
+
+from src.metrics import DB_POOL_TIMEOUTS, DB_POOL_WAIT
+from src.replicas import RoutingSession
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+
+def pool_stats(pool: Pool) -> dict:
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    return stats
+
+
+class PooledSQLAlchemy(SQLAlchemy):
+    """Applies the DB_POOL_* settings to server databases.
+
+    SQLite keeps the pools Flask-SQLAlchemy picks for it, and anything set
+    in SQLALCHEMY_ENGINE_OPTIONS still takes precedence. Sessions route
+    reads to replicas, see src.replicas.
+    """
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        sa_url, options = super().apply_driver_hacks(app, sa_url, options)
+        if sa_url.get_backend_name() == "sqlite":
+            return sa_url, options
+
+        config = app.config
+        options.setdefault("poolclass", InstrumentedQueuePool)
+        options.setdefault("pool_size", config["DB_POOL_SIZE"])
+        options.setdefault("max_overflow", config["DB_MAX_OVERFLOW"])
+        options.setdefault("pool_timeout", config["DB_POOL_TIMEOUT"])
+        options.setdefault("pool_recycle", config["DB_POOL_RECYCLE"])
+        options.setdefault("pool_pre_ping", config["DB_POOL_PRE_PING"])
+
+        timeout = config["DB_STATEMENT_TIMEOUT"]
+        if timeout and sa_url.get_backend_name() == "postgresql":
+            connect_args = options.setdefault("connect_args", {})
+            setting = f"-c statement_timeout={timeout}"
+            connect_args.setdefault("options", setting)
+        return sa_url, options
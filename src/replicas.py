@@ -0,0 +1,212 @@
+import itertools
+import threading
+import time
+from typing import Optional
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy import SignallingSession
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql.dml import UpdateBase
+
+# Requests with these methods read from a replica until they write.
+READ_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+# Seconds since the last replayed transaction, or 0 once the standby has
+# replayed everything it received (an idle primary writes nothing new).
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()"
+    " THEN 0 ELSE EXTRACT(EPOCH FROM"
+    " now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def replica_lag(connection: Connection) -> Optional[float]:
+    """Returns how many seconds a replica is behind, None if unknown."""
+    if connection.dialect.name != "postgresql":
+        return None
+    lag = connection.execute(LAG_QUERY).scalar()
+    return None if lag is None else float(lag)
+
+
+class Replica:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.ejected_until = 0.0
+        self.checked_at = None
+        self.lag = None
+        self.healthy = True
+
+    def stats(self) -> dict:
+        return {
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+        }
+
+
+class ReplicaSet:
+    """Hands out replicas round-robin, skipping unhealthy ones.
+
+    A replica is ejected for eject_seconds when it cannot be reached, or
+    when it is more than max_lag seconds behind the primary (if set). Each
+    replica is checked at most once per check_interval, so the checks cost
+    one connection per worker and interval, not one per request.
+    """
+
+    def __init__(
+        self,
+        engines: list[Engine],
+        max_lag: Optional[float] = None,
+        check_interval: float = 5,
+        eject_seconds: float = 30,
+    ):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.eject_seconds = eject_seconds
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        for replica in self.replicas:
+            handle_error = self._on_error(replica)
+            event.listen(replica.engine, "handle_error", handle_error)
+
+    def _on_error(self, replica: Replica):
+        def handle_error(context):
+            # connection is None when the replica could not be reached.
+            if context.connection is None or context.is_disconnect:
+                self.eject(replica)
+
+        return handle_error
+
+    def eject(self, replica: Replica) -> None:
+        replica.healthy = False
+        replica.ejected_until = time.monotonic() + self.eject_seconds
+        # Check it again as soon as the ejection ends.
+        replica.checked_at = None
+
+    def _check(self, replica: Replica, now: float) -> bool:
+        if replica.ejected_until > now:
+            return False
+        if replica.checked_at is None or (
+            now - replica.checked_at >= self.check_interval
+        ):
+            replica.checked_at = now
+            try:
+                with replica.engine.connect() as connection:
+                    replica.lag = replica_lag(connection)
+            except SQLAlchemyError:
+                self.eject(replica)
+                return False
+            replica.healthy = (
+                self.max_lag is None
+                or replica.lag is None
+                or replica.lag <= self.max_lag
+            )
+        return replica.healthy
+
+    def choose(self) -> Optional[Engine]:
+        """Returns the next healthy replica, or None to use the primary."""
+        with self._lock:
+            start = next(self._next)
+        now = time.monotonic()
+        count = len(self.replicas)
+        for offset in range(count):
+            replica = self.replicas[(start + offset) % count]
+            if self._check(replica, now):
+                return replica.engine
+        return None
+
+
+_lock = threading.Lock()
+
+
+def _create_engine(db, app, uri: str) -> Engine:
+    # The same options Flask-SQLAlchemy gives the primary, so replicas
+    # get the DB_POOL_* settings and statement timeout as well.
+    options = db.apply_pool_defaults(app, {})
+    sa_url, options = db.apply_driver_hacks(app, make_url(uri), options)
+    options.update(app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+    return db.create_engine(sa_url, options)
+
+
+def get_replicas() -> Optional[ReplicaSet]:
+    """Returns the replica set of the current app, None without replicas.
+
+    The set is rebuilt when SQLALCHEMY_REPLICA_URIS changes, so the
+    setting may be applied after create_app() like the primary's.
+    """
+    app = current_app._get_current_object()
+    config = app.config
+    uris = tuple(config["SQLALCHEMY_REPLICA_URIS"])
+    with _lock:
+        state = app.extensions.get("replicas")
+        if state is None or state[0] != uris:
+            db = app.extensions["sqlalchemy"].db
+            replicas = ReplicaSet(
+                [_create_engine(db, app, uri) for uri in uris],
+                max_lag=config["REPLICA_MAX_LAG"],
+                check_interval=config["REPLICA_CHECK_INTERVAL"],
+                eject_seconds=config["REPLICA_EJECT_SECONDS"],
+            )
+            state = app.extensions["replicas"] = (uris, replicas)
+    replicas = state[1]
+    return replicas if replicas.replicas else None
+
+
+def pin_primary() -> None:
+    """Sends the rest of this request's statements to the primary."""
+    if has_request_context():
+        g.db_primary = True
+
+
+def read_engine() -> Optional[Engine]:
+    """Returns the replica this request reads from, None for the primary.
+
+    The choice is kept for the whole request, so its statements share a
+    transaction (and a snapshot) on one database.
+    """
+    if not has_request_context() or request.method not in READ_METHODS:
+        return None
+    if g.get("db_primary"):
+        return None
+    if "db_replica" not in g:
+        replicas = get_replicas()
+        g.db_replica = replicas.choose() if replicas is not None else None
+    return g.db_replica
+
+
+def read_from_replica() -> bool:
+    """Returns whether this request has read from a replica.
+
+    Rows read from a replica may be older than the primary's, so they
+    must not be cached past the request.
+    """
+    return has_request_context() and g.get("db_replica") is not None
+
+
+class RoutingSession(SignallingSession):
+    """Reads from a replica in read-only requests.
+
+    Flushes and INSERT/UPDATE/DELETE statements go to the primary and pin
+    the request to it, so reads that follow a write see that write.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            pin_primary()
+        else:
+            engine = read_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper, clause)
+
+
+def _start_request():
+    g.pop("db_primary", None)
+    g.pop("db_replica", None)
+
+
+def init_app(app) -> None:
+    app.before_request(_start_request)
@@ -0,0 +1,70 @@
+import threading
+from typing import Any, Callable, Hashable
+
+from flask import current_app
+
+from src.metrics import SINGLEFLIGHT_CALLS
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class Group:
+    """Runs one call per key at a time; concurrent callers share its result.
+
+    Values are handed to every waiting thread as is, so they must not be
+    tied to the leader's thread (ORM instances of its session, say).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        SINGLEFLIGHT_CALLS.labels("executed" if leader else "coalesced").inc()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+    def stats(self) -> dict:
+        calls = self.executed + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": self.coalesced / calls if calls else 0.0,
+        }
+
+
+def get_group() -> Group:
+    """Returns the singleflight group of the current app."""
+    # setdefault so threads racing on the first request share one group.
+    return current_app.extensions.setdefault("singleflight", Group())
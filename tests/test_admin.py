@@ -1,6 +1,7 @@
 import os
 
 from src import create_app, db
+from src.api.users.models import User
 
 
 def test_admin_view_dev():
@@ -49,3 +50,63 @@ def test_admin_view_prod():
         resp = client.get("/admin/user/")
         assert resp.status_code == 404
     assert os.getenv("FLASK_ENV") == "production"
+
+
+def test_admin_view_disabled_by_config(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "development")
+    monkeypatch.setenv("APP_SETTINGS", "src.config.TestingConfig")
+    monkeypatch.setattr("src.config.TestingConfig.ADMIN_ENABLED", False)
+
+    app = create_app()
+    with app.app_context():
+        client = app.test_client()
+        resp = client.get("/admin/user/")
+        assert resp.status_code == 404
+
+
+def _users_view(app):
+    admin = app.extensions["admin"][0]
+    return next(v for v in admin._views if v.endpoint == "user")
+
+
+def test_admin_list_seeks_deep_pages(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "development")
+    app = create_app()
+    app.config.from_object("src.config.TestingConfig")
+    with app.test_request_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        for i in range(25):
+            db.session.add(User(username=f"user{i}", email=f"u{i}@x.org"))
+        db.session.commit()
+        view = _users_view(app)
+        expected = [u.id for u in User.query.order_by(User.id.desc())]
+
+        count, page = view.get_list(2, None, None, None, [], page_size=10)
+        assert count == 25
+        assert [user.id for user in page] == expected[20:]
+
+        _, empty = view.get_list(3, None, None, None, [], page_size=10)
+        assert empty == []
+
+
+def test_admin_count_is_capped(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "development")
+    app = create_app()
+    app.config.from_object("src.config.TestingConfig")
+    app.config["ADMIN_COUNT_LIMIT"] = 5
+    with app.test_request_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        for i in range(8):
+            db.session.add(User(username=f"user{i}", email=f"u{i}@x.org"))
+        db.session.commit()
+        view = _users_view(app)
+
+        count, _ = view.get_list(0, None, None, None, [])
+        assert count == 6
+        count, users = view.get_list(0, None, None, "^USER1", [])
+        assert count == 1
+        assert [user.username for user in users] == ["user1"]
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from flask import Flask
+from flask_restx import Namespace, Resource
+
+import manage
+from src import create_app
+from src.api import api
+from src.api.spec import SpecApi
+
+
+@pytest.fixture
+def docs_app(monkeypatch):
+    monkeypatch.setenv("APP_SETTINGS", "src.config.TestingConfig")
+    monkeypatch.setattr("src.config.TestingConfig.API_DOCS_ENABLED", True)
+    return create_app()
+
+
+def test_spec_is_cached_and_revalidated(docs_app, monkeypatch):
+    api._spec = None
+    calls = []
+    original = SpecApi.serialized_spec
+
+    def counting(self):
+        calls.append(self._spec is None)
+        return original(self)
+
+    monkeypatch.setattr(SpecApi, "serialized_spec", counting)
+    client = docs_app.test_client()
+
+    resp = client.get("/swagger.json")
+    etag = resp.headers["ETag"]
+
+    assert resp.status_code == 200
+    assert "/users/changes" in resp.get_json()["paths"]
+    assert resp.cache_control.public
+    assert resp.cache_control.max_age == 86400
+
+    resp_two = client.get("/swagger.json", headers={"If-None-Match": etag})
+
+    assert resp_two.status_code == 304
+    assert calls == [True, False]
+
+
+def test_spec_changes_with_namespaces():
+    app = Flask(__name__)
+    app.config["API_SPEC_MAX_AGE"] = 60
+    spec_api = SpecApi(app)
+    first = Namespace("first")
+
+    @first.route("")
+    class First(Resource):
+        def get(self):
+            return {}
+
+    spec_api.add_namespace(first)
+    client = app.test_client()
+    resp = client.get("/swagger.json")
+
+    assert list(resp.get_json()["paths"]) == ["/first"]
+
+    second = Namespace("second")
+
+    @second.route("")
+    class Second(Resource):
+        def get(self):
+            return {}
+
+    spec_api.add_namespace(second)
+    resp_two = client.get("/swagger.json")
+
+    assert sorted(resp_two.get_json()["paths"]) == ["/first", "/second"]
+    assert resp_two.headers["ETag"] != resp.headers["ETag"]
+
+
+def test_write_spec_command(docs_app, tmp_path):
+    path = tmp_path / "swagger.json"
+    runner = docs_app.test_cli_runner()
+
+    result = runner.invoke(manage.write_spec, [str(path)])
+
+    assert result.exit_code == 0, result.output
+    served = docs_app.test_client().get("/swagger.json").get_json()
+    assert json.loads(path.read_text()) == served
@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+
+import pytest
+
+from src.api.users import crud
+from src.api.users.models import User
+from src.batching import Batcher
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_concurrent_submissions_share_a_batch():
+    batches = []
+
+    def run(values):
+        batches.append(list(values))
+        return [ValueError(v) if v == 2 else v * 10 for v in values]
+
+    batcher = Batcher(run, max_size=3, max_wait=5)
+    results = {}
+
+    def worker(value):
+        try:
+            results[value] = batcher.submit(value)
+        except ValueError as e:
+            results[value] = f"error {e}"
+
+    threads = [threading.Thread(target=worker, args=(v,)) for v in (1, 2, 3)]
+    for thread in threads:
+        thread.start()
+        _wait_for(lambda: batcher.values == threads.index(thread) + 1)
+    for thread in threads:
+        thread.join()
+
+    assert batches == [[1, 2, 3]]
+    assert results == {1: 10, 2: "error 2", 3: 30}
+    assert batcher.stats()["mean_batch_size"] == 3
+
+
+def test_batch_errors_reach_every_submitter():
+    def run(values):
+        raise RuntimeError("boom")
+
+    batcher = Batcher(run, max_size=10, max_wait=0)
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
+    with pytest.raises(RuntimeError):
+        batcher.submit(2)
+    assert batcher.stats()["batches"] == 2
+
+
+def test_add_user_batch(test_app, test_database, add_user):
+    add_user("taken", "taken@batch.io")
+
+    results = crud._add_user_batch(
+        [
+            ("one", "one@batch.io"),
+            ("taken", "TAKEN@batch.io"),
+            ("two", "two@batch.io"),
+            ("again", "One@batch.io"),
+        ]
+    )
+
+    assert [type(result) for result in results] == [
+        User,
+        crud.DuplicateEmailError,
+        User,
+        crud.DuplicateEmailError,
+    ]
+    assert results[0].id is not None
+    assert results[2].created_date is not None
+    query = User.query.filter(User.email.like("%@batch.io"))
+    assert query.count() == 3
+
+
+def test_add_user_batch_retries_items_after_a_race(
+    test_app, test_database, add_user, monkeypatch
+):
+    add_user("raced", "raced@batch.io")
+    # As if the email was taken after the batch checked it.
+    monkeypatch.setattr(crud, "get_existing_emails", lambda emails: set())
+
+    results = crud._add_user_batch(
+        [("raced", "raced@batch.io"), ("fine", "fine@batch.io")]
+    )
+
+    assert isinstance(results[0], crud.DuplicateEmailError)
+    assert results[1].email == "fine@batch.io"
+
+
+def test_group_commit_endpoint(test_app, test_database):
+    test_app.config["USERS_GROUP_COMMIT"] = True
+    client = test_app.test_client()
+    try:
+        payload = {"username": "grouped", "email": "grouped@batch.io"}
+        resp = client.post(
+            "/users", data=json.dumps(payload), content_type="application/json"
+        )
+        resp_two = client.post(
+            "/users", data=json.dumps(payload), content_type="application/json"
+        )
+    finally:
+        test_app.config["USERS_GROUP_COMMIT"] = False
+
+    assert resp.status_code == 201
+    assert resp_two.status_code == 400
+
+    body = client.get("/metrics").data.decode()
+
+    assert 'group_commit_batch_size_count{name="users:add"} ' in body
+    assert 'group_commit_wait_seconds_count{name="users:add"} ' in body
+    assert client.get("/stats/group-commit").status_code == 404
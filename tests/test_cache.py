@@ -0,0 +1,138 @@
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.api.users import crud
+from src.cache import MemoryCache, SQLiteCache, get_cache
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(size=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+
+
+def test_memory_cache_stats():
+    cache = MemoryCache(size=2, ttl=60)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    stats = cache.stats()
+
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_sqlite_cache_is_shared(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = SQLiteCache(size=2, ttl=60, path=path)
+    second = SQLiteCache(size=2, ttl=60, path=path)
+    first.set("a", {"id": 1})
+    first.set("b", {"id": 2})
+    first.set("c", {"id": 3})
+
+    assert second.get("c") == {"id": 3}
+    assert len(second) == 2
+    second.delete("c")
+    assert first.get("c") is None
+
+
+def test_sqlite_cache_stores_json(tmp_path):
+    path = str(tmp_path / "private" / "cache.sqlite3")
+    cache = SQLiteCache(size=2, ttl=60, path=path)
+    row = {"id": 1, "created_date": datetime(2021, 5, 1, 12, 30, 15, 250)}
+    cache.set("a", row)
+
+    assert cache.get("a") == row
+    assert oct(os.stat(tmp_path / "private").st_mode & 0o777) == "0o700"
+    with sqlite3.connect(path) as conn:
+        stored = conn.execute("SELECT value FROM entries").fetchone()[0]
+    assert json.loads(stored)["created_date"] == {
+        "$datetime": "2021-05-01T12:30:15.000250"
+    }
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_versioned_entries_are_not_replaced_by_older_ones(backend, tmp_path):
+    if backend == "memory":
+        cache = MemoryCache(size=10, ttl=60)
+    else:
+        cache = SQLiteCache(size=10, ttl=60, path=str(tmp_path / "c.sqlite3"))
+
+    cache.set("a", {"version": 2}, version=2)
+    cache.set("a", {"version": 1}, version=1)
+    assert cache.get("a") == {"version": 2}
+
+    cache.invalidate("a", 3)
+    assert cache.get("a") is None
+    cache.set("a", {"version": 2}, version=2)
+    assert cache.get("a") is None
+    cache.set("a", {"version": 3}, version=3)
+    assert cache.get("a") == {"version": 3}
+
+    cache.set("a", "unversioned")
+    assert cache.get("a") == "unversioned"
+
+
+def test_load_racing_with_an_update_is_not_cached(test_app, test_database, add_user):
+    user = add_user("racer", "racer@testdriven.io")
+    user_id = user.id
+    # Loaded before the update, cached after it.
+    before = crud._detached(crud._snapshot(user))
+    assert crud.update_user(user_id, username="updated") is not None
+    crud._cache_user(before)
+
+    assert get_cache().get(f"user:id:{user_id}") is None
+    assert crud.get_user_by_id(user_id).username == "updated"
+    assert get_cache().get(f"user:id:{user_id}")["username"] == "updated"
+
+
+def test_get_user_is_cached(test_app, test_database, add_user):
+    user = add_user("cached", "cached@testdriven.io")
+    client = test_app.test_client()
+    client.get(f"/users/{user.id}")
+    hits = get_cache().hits
+    labels = {"backend": get_cache().backend, "result": "hit"}
+    exported = REGISTRY.get_sample_value("cache_requests_total", labels) or 0
+    resp = client.get(f"/users/{user.id}")
+
+    assert resp.status_code == 200
+    assert resp.get_json()["username"] == "cached"
+    assert get_cache().hits == hits + 1
+    assert REGISTRY.get_sample_value("cache_requests_total", labels) == exported + 1
+    assert client.get("/stats/cache").status_code == 404
+
+
+def test_update_user_invalidates_cache(test_app, test_database, add_user):
+    user = add_user("stale", "stale@testdriven.io")
+    client = test_app.test_client()
+    client.get(f"/users/{user.id}")
+    client.put(
+        f"/users/{user.id}",
+        data=json.dumps({"username": "fresh", "email": "fresh@testdriven.io"}),
+        content_type="application/json",
+    )
+    resp = client.get(f"/users/{user.id}")
+
+    assert resp.get_json()["username"] == "fresh"
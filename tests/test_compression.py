@@ -0,0 +1,54 @@
+import gzip
+import json
+
+from src.api.users.models import User
+
+
+def test_small_response_is_not_compressed(test_app):
+    client = test_app.test_client()
+    resp = client.get("/ping", headers={"Accept-Encoding": "gzip"})
+
+    assert resp.status_code == 200
+    assert "Content-Encoding" not in resp.headers
+    assert json.loads(resp.data)["message"] == "pong!"
+
+
+def test_large_response_is_gzipped(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    for i in range(20):
+        add_user(f"user{i}", f"user{i}@testdriven.io")
+    client = test_app.test_client()
+    resp = client.get("/users", headers={"Accept-Encoding": "gzip"})
+    data = json.loads(gzip.decompress(resp.data))
+
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert resp.headers["ETag"].startswith("W/")
+    assert int(resp.headers["Content-Length"]) == len(resp.data)
+    assert len(data) == 20
+
+
+def test_identity_is_respected(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    for i in range(20):
+        add_user(f"user{i}", f"user{i}@testdriven.io")
+    client = test_app.test_client()
+    resp = client.get("/users", headers={"Accept-Encoding": "identity"})
+
+    assert resp.status_code == 200
+    assert "Content-Encoding" not in resp.headers
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert len(json.loads(resp.data)) == 20
+
+
+def test_min_size_is_configurable(test_app, test_database):
+    test_app.config["COMPRESS_MIN_SIZE"] = 0
+    try:
+        client = test_app.test_client()
+        resp = client.get("/ping", headers={"Accept-Encoding": "gzip"})
+    finally:
+        test_app.config["COMPRESS_MIN_SIZE"] = 500
+
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(resp.data))["message"] == "pong!"
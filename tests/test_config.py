@@ -1,5 +1,7 @@
 import os
 
+from src.config import env_flag
+
 
 def test_development_config(test_app):
     test_app.config.from_object("src.config.DevelopmentConfig")
@@ -21,3 +23,13 @@ def test_production_config(test_app):
     assert not test_app.config["TESTING"]
     assert test_app.config["SECRET_KEY"] == "my_precious"
     assert test_app.config["SQLALCHEMY_DATABASE_URI"] == os.getenv("DATABASE_URL")
+
+
+def test_env_flag(monkeypatch):
+    monkeypatch.delenv("SOME_FLAG", raising=False)
+    assert env_flag("SOME_FLAG") is None
+    assert env_flag("SOME_FLAG", default=True) is True
+
+    for value, expected in [("True", True), ("1", True), ("false", False)]:
+        monkeypatch.setenv("SOME_FLAG", value)
+        assert env_flag("SOME_FLAG", default=True) is expected
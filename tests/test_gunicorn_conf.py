@@ -0,0 +1,41 @@
+import importlib.util
+import math
+import os
+
+spec = importlib.util.spec_from_file_location(
+    "gunicorn_conf",
+    os.path.join(os.path.dirname(__file__), "..", "gunicorn.conf.py"),
+)
+gunicorn_conf = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(gunicorn_conf)
+
+
+def test_cgroup_v2_quota(tmp_path):
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert gunicorn_conf.cgroup_cpu_limit(str(tmp_path)) == 1.5
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert gunicorn_conf.cgroup_cpu_limit(str(tmp_path)) == math.inf
+
+
+def test_cgroup_v1_quota(tmp_path):
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("200000\n")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert gunicorn_conf.cgroup_cpu_limit(str(tmp_path)) == 2
+
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    assert gunicorn_conf.cgroup_cpu_limit(str(tmp_path)) == math.inf
+
+
+def test_available_cpus_follow_the_quota(tmp_path):
+    (tmp_path / "cpu.max").write_text("50000 100000\n")
+    assert gunicorn_conf.available_cpus(str(tmp_path)) == 1
+
+    missing = str(tmp_path / "missing")
+    assert gunicorn_conf.available_cpus(missing) == len(os.sched_getaffinity(0))
+
+
+def test_default_workers_are_capped():
+    if "WEB_CONCURRENCY" not in os.environ:
+        assert gunicorn_conf.workers <= gunicorn_conf.MAX_DEFAULT_WORKERS
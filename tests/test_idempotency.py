@@ -0,0 +1,196 @@
+import json
+import threading
+
+import pytest
+from sqlalchemy import event
+
+from src.api.users.models import User
+from src.idempotency import (
+    DatabaseStore,
+    IdempotencyStore,
+    MemoryStore,
+    claim_or_wait,
+    create_store,
+)
+
+
+def _post(client, payload, key=None):
+    headers = {"Idempotency-Key": key} if key is not None else {}
+    return client.post(
+        "/users",
+        data=json.dumps(payload),
+        content_type="application/json",
+        headers=headers,
+    )
+
+
+def test_retry_replays_the_response(test_app, test_database):
+    client = test_app.test_client()
+    payload = {"username": "retry", "email": "retry@idempotency.io"}
+
+    resp = _post(client, payload, key="create-retry")
+    resp_two = _post(client, payload, key="create-retry")
+
+    assert resp.status_code == 201
+    assert resp_two.status_code == 201
+    assert resp_two.get_json() == resp.get_json()
+    assert resp_two.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in resp.headers
+    assert User.query.filter_by(email="retry@idempotency.io").count() == 1
+
+
+def test_key_reused_for_another_request(test_app, test_database):
+    client = test_app.test_client()
+    payload = {"username": "reused", "email": "reused@idempotency.io"}
+    other = {"username": "reused", "email": "other@idempotency.io"}
+
+    resp = _post(client, payload, key="create-reused")
+    resp_two = _post(client, other, key="create-reused")
+
+    assert resp.status_code == 201
+    assert resp_two.status_code == 422
+    assert "different request" in resp_two.get_json()["message"]
+    assert User.query.filter_by(email="other@idempotency.io").count() == 0
+
+
+def test_client_errors_are_replayed(test_app, test_database, add_user):
+    add_user("dupe", "dupe@idempotency.io")
+    client = test_app.test_client()
+    payload = {"username": "dupe", "email": "dupe@idempotency.io"}
+
+    resp = _post(client, payload, key="create-dupe")
+    resp_two = _post(client, payload, key="create-dupe")
+
+    assert resp.status_code == 400
+    assert resp_two.status_code == 400
+    assert resp_two.headers["Idempotent-Replayed"] == "true"
+
+
+def test_invalid_key(test_app, test_database):
+    client = test_app.test_client()
+    payload = {"username": "badkey", "email": "badkey@idempotency.io"}
+
+    resp = _post(client, payload, key="")
+    resp_two = _post(client, payload, key="k" * 256)
+
+    assert resp.status_code == 400
+    assert resp_two.status_code == 400
+    assert User.query.filter_by(email="badkey@idempotency.io").count() == 0
+
+
+def test_without_key(test_app, test_database):
+    client = test_app.test_client()
+    payload = {"username": "nokey", "email": "nokey@idempotency.io"}
+
+    resp = _post(client, payload)
+    resp_two = _post(client, payload)
+
+    assert resp.status_code == 201
+    assert resp_two.status_code == 400
+
+
+def test_memory_store():
+    store = MemoryStore(ttl=60, lock_timeout=60, size=2)
+
+    assert store.get("a") is None
+    assert store.claim("a", "fp") is None
+    assert store.claim("a", "fp") == ("fp", None)
+    store.complete("a", "saved")
+    assert store.get("a") == ("fp", "saved")
+    assert store.claim("a", "other") == ("fp", "saved")
+    # Only unfinished claims are released.
+    store.release("a")
+    assert store.claim("a", "fp") == ("fp", "saved")
+
+    store.claim("b", "fp")
+    store.release("b")
+    assert store.claim("b", "fp") is None
+    store.claim("c", "fp")
+    assert store.claim("a", "fp") is None
+
+
+def test_memory_store_takes_over_expired_claims():
+    store = MemoryStore(ttl=60, lock_timeout=0, size=10)
+
+    assert store.claim("a", "fp") is None
+    assert store.claim("a", "fp") is None
+
+
+def test_database_store(test_app, test_database):
+    store = DatabaseStore(ttl=60, lock_timeout=60)
+
+    assert store.get("db-a") is None
+    assert store.claim("db-a", "fp") is None
+    assert store.claim("db-a", "fp") == ("fp", None)
+    assert store.get("db-a") == ("fp", None)
+    store.complete("db-a", "saved")
+    assert store.claim("db-a", "other") == ("fp", "saved")
+    store.release("db-a")
+    assert store.claim("db-a", "fp") == ("fp", "saved")
+
+    store.claim("db-b", "fp")
+    store.release("db-b")
+    assert store.claim("db-b", "fp") is None
+
+    expired = DatabaseStore(ttl=60, lock_timeout=-1)
+    assert expired.claim("db-c", "fp") is None
+    assert expired.get("db-c") is None
+    assert expired.claim("db-c", "other") is None
+    assert expired.claim("db-c", "fp") is None
+
+
+def test_claim_or_wait_gets_the_saved_response():
+    store = MemoryStore(ttl=60, lock_timeout=60, size=10)
+    store.claim("a", "fp")
+    timer = threading.Timer(0.05, store.complete, ("a", "saved"))
+    timer.start()
+
+    record = claim_or_wait(store, "a", "fp", timeout=5, interval=0.01)
+    timer.join()
+
+    assert record == ("fp", "saved")
+
+
+def test_waiting_polls_without_inserting(test_app, test_database):
+    store = DatabaseStore(ttl=60, lock_timeout=60)
+    store.claim("db-wait", "fp")
+    statements = []
+
+    def log(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(test_database.engine, "before_cursor_execute", log)
+    try:
+        record = claim_or_wait(store, "db-wait", "fp", timeout=0.1, interval=0.01)
+    finally:
+        event.remove(test_database.engine, "before_cursor_execute", log)
+
+    assert record == ("fp", None)
+    inserts = [s for s in statements if s.startswith("INSERT")]
+    assert len(inserts) == 1
+    assert "ON CONFLICT DO NOTHING" in inserts[0]
+    assert len(statements) > 3
+
+
+def test_claim_or_wait_gives_up():
+    store = MemoryStore(ttl=60, lock_timeout=60, size=10)
+    store.claim("a", "fp")
+
+    assert claim_or_wait(store, "a", "fp", timeout=0) == ("fp", None)
+    assert claim_or_wait(store, "a", "other", timeout=5) == ("fp", None)
+
+
+def test_create_store():
+    config = {
+        "IDEMPOTENCY_BACKEND": "memory",
+        "IDEMPOTENCY_TTL": 60,
+        "IDEMPOTENCY_LOCK_TTL": 10,
+        "IDEMPOTENCY_MAX_KEYS": 5,
+    }
+
+    assert isinstance(create_store(config), MemoryStore)
+    config["IDEMPOTENCY_BACKEND"] = "null"
+    assert type(create_store(config)) is IdempotencyStore
+    config["IDEMPOTENCY_BACKEND"] = "redis"
+    with pytest.raises(ValueError):
+        create_store(config)
@@ -0,0 +1,73 @@
+import copy
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import exc, text
+
+
+def test_server_timing_header(test_app, test_database):
+    client = test_app.test_client()
+    resp = client.get("/users")
+
+    assert resp.status_code == 200
+    assert resp.headers["Server-Timing"].startswith("db;dur=")
+    assert "app;dur=" in resp.headers["Server-Timing"]
+
+
+def test_metrics_endpoint(test_app, test_database):
+    client = test_app.test_client()
+    client.get("/users")
+    client.get("/ping")
+    resp = client.get("/metrics")
+    body = resp.data.decode()
+
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+    assert (
+        'http_request_duration_seconds_count{endpoint="/users",'
+        'method="GET",status="200"}' in body
+    )
+    assert 'db_statements_total{endpoint="/users"}' in body
+    assert 'http_requests_in_progress{endpoint="/ping",method="GET"} 0.0' in body
+
+
+def test_failed_statements_leave_no_state(test_app, test_database):
+    with test_database.engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        info = copy.deepcopy(conn.info)
+        for _ in range(3):
+            with pytest.raises(exc.OperationalError):
+                conn.execute(text("SELECT * FROM no_such_table"))
+
+        assert conn.info == info
+
+
+def test_unmatched_paths_share_a_label(test_app):
+    client = test_app.test_client()
+    client.get("/no/such/path")
+    body = client.get("/metrics").data.decode()
+
+    assert 'endpoint="unmatched"' in body
+    assert "/no/such/path" not in body
+
+
+def test_streamed_response_is_recorded_when_sent(test_app, test_database, add_user):
+    add_user("streamed", "streamed@metrics.io")
+    client = test_app.test_client()
+    labels = {"endpoint": "/users/export"}
+    size_labels = dict(labels, method="GET")
+
+    def sample(name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    statements = sample("db_statements_total", labels)
+    size = sample("http_response_size_bytes_sum", size_labels)
+    resp = client.get("/users/export", headers={"Accept-Encoding": "identity"})
+    body = resp.get_data()
+    resp.close()
+
+    assert b"streamed@metrics.io" in body
+    assert "Server-Timing" not in resp.headers
+    assert sample("db_statements_total", labels) > statements
+    assert sample("http_response_size_bytes_sum", size_labels) == size + len(body)
+    assert sample("http_requests_in_progress", size_labels) == 0
@@ -0,0 +1,67 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+
+from src import db
+from src.pool import InstrumentedQueuePool, pool_stats
+
+
+def test_instrumented_pool_stats(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=2,
+        max_overflow=1,
+    )
+    waits = REGISTRY.get_sample_value("db_pool_wait_seconds_count") or 0
+    with engine.connect():
+        stats = pool_stats(engine.pool)
+
+    assert stats["pool"] == "InstrumentedQueuePool"
+    assert stats["size"] == 2
+    assert stats["checked_out"] == 1
+    assert stats["max_overflow"] == 1
+    assert REGISTRY.get_sample_value("db_pool_wait_seconds_count") == waits + 1
+
+
+def test_pool_options_for_postgres(test_app):
+    url = make_url("postgresql://user:pass@db/users")
+    test_app.config["DB_POOL_SIZE"] = 7
+    try:
+        _, options = db.apply_driver_hacks(test_app, url, {})
+    finally:
+        test_app.config["DB_POOL_SIZE"] = 5
+
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] == 7
+    assert options["pool_pre_ping"] is True
+    assert "statement_timeout" in options["connect_args"]["options"]
+
+
+def test_pool_options_skip_sqlite(test_app):
+    _, options = db.apply_driver_hacks(test_app, make_url("sqlite://"), {})
+
+    assert "pool_size" not in options
+
+
+def test_pool_timeouts_are_counted(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.01,
+    )
+    timeouts = REGISTRY.get_sample_value("db_pool_timeouts_total") or 0
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    assert REGISTRY.get_sample_value("db_pool_timeouts_total") == timeouts + 1
+
+
+def test_pool_stats_endpoint_is_gone(test_app, test_database):
+    client = test_app.test_client()
+
+    assert client.get("/stats/pool").status_code == 404
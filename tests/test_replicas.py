@@ -0,0 +1,139 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+
+from src import create_app, db
+from src.api.users.models import User
+from src.cache import get_cache
+from src.replicas import ReplicaSet, _start_request, get_replicas
+
+
+@pytest.fixture
+def replica(test_app, test_database, tmp_path):
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    test_app.config["SQLALCHEMY_REPLICA_URIS"] = [url]
+    engine = get_replicas().replicas[0].engine
+    User.__table__.create(engine)
+    yield engine
+    test_app.config["SQLALCHEMY_REPLICA_URIS"] = []
+
+
+def test_get_reads_from_replica(test_app, replica):
+    with replica.begin() as connection:
+        connection.execute(
+            User.__table__.insert(),
+            {"id": 4242, "username": "replicated", "email": "r@replica.io"},
+        )
+    client = test_app.test_client()
+
+    resp = client.get("/users/4242")
+
+    assert resp.status_code == 200
+    assert resp.get_json()["username"] == "replicated"
+    assert db.session.query(User).get(4242) is None
+
+
+def test_replica_reads_are_not_cached(test_app, replica, add_user):
+    user_id = add_user("alice", "alice@replica.io").id
+    row = {"id": user_id, "username": "alice", "email": "alice@replica.io"}
+    with replica.begin() as connection:
+        connection.execute(User.__table__.insert(), row)
+    # Requests start with an empty session, as they do outside tests.
+    db.session.remove()
+    client = test_app.test_client()
+
+    resp = client.put(
+        f"/users/{user_id}",
+        data=json.dumps({"username": "bob", "email": "alice@replica.io"}),
+        content_type="application/json",
+    )
+    assert resp.status_code == 200
+    db.session.remove()
+    # The replica has not caught up yet.
+    assert client.get(f"/users/{user_id}").get_json()["username"] == "alice"
+
+    with replica.begin() as connection:
+        update = User.__table__.update().where(User.id == user_id)
+        connection.execute(update.values(username="bob"))
+    db.session.remove()
+
+    assert client.get(f"/users/{user_id}").get_json()["username"] == "bob"
+    assert get_cache().get(f"user:id:{user_id}") is None
+
+
+def test_writes_pin_request_to_primary(test_app, replica):
+    with test_app.test_request_context("/users", method="GET"):
+        _start_request()
+        assert db.session.get_bind() is replica
+
+        db.session.add(User(username="pinned", email="pinned@primary.io"))
+        db.session.flush()
+
+        assert db.session.get_bind() is db.engine
+        db.session.rollback()
+    db.session.remove()
+
+
+def test_writing_requests_use_primary(test_app, replica):
+    with test_app.test_request_context("/users", method="POST"):
+        _start_request()
+        assert db.session.get_bind() is db.engine
+    db.session.remove()
+
+
+def test_round_robin_skips_unreachable_replica(tmp_path):
+    good = [create_engine(f"sqlite:///{tmp_path / f'{i}.db'}") for i in (1, 2)]
+    bad = create_engine(f"sqlite:///{tmp_path / 'missing' / 'x.db'}")
+    replicas = ReplicaSet([good[0], bad, good[1]])
+
+    chosen = [replicas.choose() for _ in range(4)]
+
+    assert chosen == [good[0], good[1], good[1], good[0]]
+    assert [replica.healthy for replica in replicas.replicas] == [
+        True,
+        False,
+        True,
+    ]
+
+
+def test_lagging_replica_is_skipped(tmp_path, monkeypatch):
+    engines = [create_engine(f"sqlite:///{tmp_path / f'{i}.db'}") for i in (1, 2)]
+    lags = {engines[0].url: 10.0, engines[1].url: 0.5}
+    monkeypatch.setattr(
+        "src.replicas.replica_lag", lambda connection: lags[connection.engine.url]
+    )
+    replicas = ReplicaSet(engines, max_lag=5)
+
+    assert [replicas.choose() for _ in range(2)] == [engines[1], engines[1]]
+
+    replicas.max_lag = None
+    replicas.check_interval = 0
+    assert [replicas.choose() for _ in range(2)] == engines
+
+
+def test_no_replicas_uses_primary(test_app):
+    assert get_replicas() is None
+
+
+def test_replica_stats(test_app, replica, monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    client = test_app.test_client()
+    resp = client.get("/stats/replicas")
+    data = resp.get_json()
+
+    assert resp.status_code == 200
+    assert data[0]["healthy"] is True
+    assert data[0]["url"].endswith("replica.db")
+
+
+def test_replica_stats_off_in_production(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "production")
+    monkeypatch.setenv("APP_SETTINGS", "src.config.TestingConfig")
+
+    app = create_app()
+    client = app.test_client()
+    assert client.get("/stats/replicas").status_code == 404
+
+    app.config["STATS_ENABLED"] = True
+    assert client.get("/stats/replicas").status_code == 200
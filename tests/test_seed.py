@@ -0,0 +1,21 @@
+from src.api.users.models import User
+from src.api.users.seed import generate_users, seed_users
+
+
+def test_generate_users_is_reproducible():
+    first = list(generate_users(5, start=10, seed=1))
+    second = list(generate_users(5, start=10, seed=1))
+
+    assert first == second
+    assert [row["email"] for row in first][0] == "user10@example.com"
+
+
+def test_seed_users_inserts_in_batches(test_app, test_database):
+    test_database.session.query(User).delete()
+    test_database.session.commit()
+    seed_users(25, batch_size=10)
+    seed_users(5, batch_size=10)
+
+    emails = [email for email, in test_database.session.query(User.email)]
+    assert len(emails) == 30
+    assert len(set(emails)) == 30
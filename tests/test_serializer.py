@@ -0,0 +1,46 @@
+import json
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from flask_restx import Model, fields, marshal
+
+from src.api.serializer import compile_model
+
+model = Model(
+    "Sample",
+    {
+        "id": fields.Integer,
+        "name": fields.String,
+        "score": fields.Float(default=1.5),
+        "active": fields.Boolean,
+        "created": fields.DateTime,
+    },
+)
+
+samples = [
+    SimpleNamespace(
+        id=1, name="jeffrey", score=2, active=1, created=datetime(2021, 5, 1, 8)
+    ),
+    SimpleNamespace(id="2", name=None, score=None, active=False, created=None),
+    {"id": 3, "name": 42, "active": True, "created": date(2021, 5, 1)},
+    {"id": 4, "created": "2021-05-01T08:00:00"},
+]
+
+
+def test_compiled_model_matches_marshal():
+    serialize = compile_model(model)
+
+    assert serialize.__name__ == "serialize"
+    for sample in samples:
+        expected = json.dumps(marshal(sample, model))
+        assert json.dumps(serialize(sample)) == expected
+
+
+def test_compiled_model_falls_back_for_unsupported_fields():
+    nested = Model("Nested", {"sample": fields.Nested(model)})
+    serialize = compile_model(nested)
+    data = {"sample": samples[0]}
+
+    assert serialize.__name__ == "<lambda>"
+
+    assert serialize(data) == marshal(data, nested)
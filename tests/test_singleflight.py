@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from src.singleflight import Group
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_concurrent_calls_share_one_execution():
+    group = Group()
+    release = threading.Event()
+    calls, results = [], []
+
+    def load():
+        calls.append(1)
+        release.wait()
+        return {"id": 1}
+
+    def worker():
+        results.append(group.do("user:1", load))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: group.coalesced == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"id": 1}] * 4
+    assert group.stats()["executed"] == 1
+    assert group.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_caller():
+    group = Group()
+    release = threading.Event()
+    errors = []
+
+    def load():
+        release.wait()
+        raise ValueError("boom")
+
+    def worker():
+        try:
+            group.do("key", load)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: group.coalesced == 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ["boom", "boom"]
+
+
+def test_sequential_calls_run_again():
+    group = Group()
+    assert group.do("key", lambda: 1) == 1
+    assert group.do("key", lambda: 2) == 2
+    with pytest.raises(KeyError):
+        group.do("key", lambda: {}["missing"])
+    assert group.stats()["coalesced"] == 0
+
+
+def test_coalescing_metrics(test_app, test_database):
+    client = test_app.test_client()
+    client.get("/users")
+    body = client.get("/metrics").data.decode()
+
+    assert 'singleflight_calls_total{result="executed"}' in body
+    assert client.get("/stats/coalescing").status_code == 404
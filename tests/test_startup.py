@@ -0,0 +1,39 @@
+from benchmarks.startup import parse_importtime
+from src import create_app
+
+
+def test_api_docs_disabled_by_config(monkeypatch):
+    monkeypatch.setenv("APP_SETTINGS", "src.config.TestingConfig")
+    monkeypatch.setattr("src.config.TestingConfig.API_DOCS_ENABLED", False)
+
+    app = create_app()
+    client = app.test_client()
+    assert client.get("/swagger.json").status_code == 404
+    assert client.get("/doc").status_code == 404
+    assert client.get("/ping").status_code == 200
+
+
+def test_api_docs_enabled_by_default_in_production(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "production")
+    monkeypatch.setenv("APP_SETTINGS", "src.config.TestingConfig")
+
+    app = create_app()
+    client = app.test_client()
+    assert client.get("/swagger.json").status_code == 200
+
+
+def test_parse_importtime():
+    stderr = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |   zipimport",
+            "import time:      1500 |       4000 | flask",
+        ]
+    )
+    imports = parse_importtime(stderr)
+
+    assert imports[1] == {
+        "module": "flask",
+        "self_ms": 1.5,
+        "cumulative_ms": 4.0,
+    }
@@ -45,6 +45,16 @@ def test_add_user_duplicate_email(test_app, test_database):
     assert data["message"] == "Sorry. That email already exists."
 
 
+def test_add_user_duplicate_email_case_insensitive(test_app, test_database):
+    client = test_app.test_client()
+    data = json.dumps({"username": "michael", "email": "MICHAEL@testdriven.io"})
+    resp = client.post("/users", data=data, content_type="application/json")
+    data = resp.get_json()
+
+    assert resp.status_code == 400
+    assert data["message"] == "Sorry. That email already exists."
+
+
 def test_single_user(test_app, test_database, add_user):
     user = add_user("jeffrey", "jeffrey@testdriven.io")
     client = test_app.test_client()
@@ -136,6 +146,68 @@ def test_update_user(test_app, test_database, add_user):
     assert "me@testdriven.io" in data["email"]
 
 
+def test_patch_user(test_app, test_database, add_user):
+    user = add_user("user-to-be-patched", "patch-me@testdriven.io")
+    client = test_app.test_client()
+    resp = client.patch(
+        f"/users/{user.id}",
+        data=json.dumps({"username": "patched"}),
+        content_type="application/json",
+    )
+    data = resp.get_json()
+
+    assert resp.status_code == 200
+    assert data["id"] == user.id
+    assert data["username"] == "patched"
+    assert data["email"] == "patch-me@testdriven.io"
+    assert resp.headers["ETag"] == f'W/"{user.id}-2"'
+
+    resp_two = client.get(f"/users/{user.id}")
+    data = resp_two.get_json()
+
+    assert data["username"] == "patched"
+    assert data["email"] == "patch-me@testdriven.io"
+
+
+patch_user_invalid_cases = [
+    [1, {}, 400, "Expected username or email"],
+    [1, {"email": None}, 400, "Input payload validation failed"],
+    [999, {"username": "me"}, 404, "User 999 does not exist"],
+]
+
+
+@pytest.mark.parametrize(
+    "user_id, payload, status_code, message", patch_user_invalid_cases
+)
+def test_patch_user_invalid(
+    test_app, test_database, user_id, payload, status_code, message
+):
+    client = test_app.test_client()
+    resp = client.patch(
+        f"/users/{user_id}", data=json.dumps(payload), content_type="application/json"
+    )
+    data = resp.get_json()
+
+    assert resp.status_code == status_code
+    assert message in data["message"]
+
+
+def test_patch_user_duplicate_email(test_app, test_database, add_user):
+    add_user("patch-hajek", "rob@patch-hajek.org")
+    user = add_user("patch-rob", "patch-rob@notreal.com")
+
+    client = test_app.test_client()
+    resp = client.patch(
+        f"/users/{user.id}",
+        data=json.dumps({"email": "rob@patch-hajek.org"}),
+        content_type="application/json",
+    )
+    data = resp.get_json()
+
+    assert resp.status_code == 400
+    assert "Sorry. That email already exists." in data["message"]
+
+
 update_user_invalid_cases = [
     [1, {}, 400, "Input payload validation failed"],
     [1, {"email": "me@testdriven.io"}, 400, "Input payload validation failed"],
@@ -171,10 +243,75 @@ def test_update_user_duplicate_email(test_app, test_database, add_user):
     client = test_app.test_client()
     resp = client.put(
         f"/users/{user.id}",
-        data=json.dumps({"username": "rob", "email": "rob@notreal.com"}),
+        data=json.dumps({"username": "rob", "email": "rob@hajek.org"}),
         content_type="application/json",
     )
     data = resp.get_json()
 
     assert resp.status_code == 400
     assert "Sorry. That email already exists." in data["message"]
+
+    resp_two = client.put(
+        f"/users/{user.id}",
+        data=json.dumps({"username": "robert", "email": "rob@notreal.com"}),
+        content_type="application/json",
+    )
+
+    assert resp_two.status_code == 200
+
+
+def test_all_users_paginated(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    add_user("page-one", "page-one@testdriven.io")
+    add_user("page-two", "page-two@testdriven.io")
+    add_user("page-three", "page-three@testdriven.io")
+    client = test_app.test_client()
+    resp = client.get("/users?limit=2")
+    data = resp.get_json()
+
+    assert resp.status_code == 200
+    assert [u["username"] for u in data] == ["page-one", "page-two"]
+    assert 'rel="next"' in resp.headers["Link"]
+
+    next_url = resp.headers["Link"].split(">")[0].lstrip("<")
+    resp_two = client.get(next_url)
+    data = resp_two.get_json()
+
+    assert resp_two.status_code == 200
+    assert [u["username"] for u in data] == ["page-three"]
+    assert "Link" not in resp_two.headers
+
+
+def test_all_users_sorted_descending(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    add_user("first", "first@testdriven.io")
+    add_user("second", "second@testdriven.io")
+    client = test_app.test_client()
+    resp = client.get("/users?sort=-created_date")
+    data = resp.get_json()
+
+    assert resp.status_code == 200
+    assert [u["username"] for u in data] == ["second", "first"]
+
+
+def test_all_users_filter_active(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    add_user("active", "active@testdriven.io")
+    inactive = add_user("inactive", "inactive@testdriven.io")
+    inactive.active = False
+    test_database.session.commit()
+    client = test_app.test_client()
+    resp = client.get("/users?active=false")
+    data = resp.get_json()
+
+    assert resp.status_code == 200
+    assert [u["username"] for u in data] == ["inactive"]
+
+
+def test_all_users_invalid_cursor(test_app, test_database):
+    client = test_app.test_client()
+    resp = client.get("/users?cursor=not-a-cursor")
+    data = resp.get_json()
+
+    assert resp.status_code == 400
+    assert "Invalid cursor" in data["message"]
@@ -0,0 +1,72 @@
+import json
+
+from src.api.users.models import User
+
+
+def test_bulk_add_users(test_app, test_database):
+    test_database.session.query(User).delete()
+    client = test_app.test_client()
+    data = json.dumps(
+        [
+            {"username": "jeffrey", "email": "jeffrey@testdriven.io"},
+            {"username": "fletcher", "email": "fletcher@notreal.com"},
+        ]
+    )
+    resp = client.post("/users/bulk", data=data, content_type="application/json")
+    data = resp.get_json()
+
+    assert resp.status_code == 200
+    assert data["created"] == 2
+    assert [r["status"] for r in data["results"]] == ["created", "created"]
+    assert test_database.session.query(User).count() == 2
+
+
+def test_bulk_add_users_duplicates_and_invalid(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    add_user("michael", "michael@testdriven.io")
+    client = test_app.test_client()
+    data = json.dumps(
+        [
+            {"username": "michael", "email": "michael@testdriven.io"},
+            {"username": "jeffrey", "email": "jeffrey@testdriven.io"},
+            {"username": "jeff", "email": "jeffrey@testdriven.io"},
+            {"email": "no-username@testdriven.io"},
+        ]
+    )
+    resp = client.post("/users/bulk", data=data, content_type="application/json")
+    data = resp.get_json()
+
+    assert resp.status_code == 200
+    assert [r["status"] for r in data["results"]] == [
+        "duplicate",
+        "created",
+        "duplicate",
+        "invalid",
+    ]
+    assert data["created"] == 1
+    assert data["duplicate"] == 2
+    assert data["invalid"] == 1
+
+
+def test_bulk_add_users_ndjson(test_app, test_database):
+    test_database.session.query(User).delete()
+    client = test_app.test_client()
+    data = "\n".join(
+        [
+            json.dumps({"username": "jeffrey", "email": "jeffrey@testdriven.io"}),
+            "not json",
+        ]
+    )
+    resp = client.post("/users/bulk", data=data, content_type="application/x-ndjson")
+    data = resp.get_json()
+
+    assert resp.status_code == 200
+    assert [r["status"] for r in data["results"]] == ["created", "invalid"]
+
+
+def test_bulk_add_users_not_a_list(test_app, test_database):
+    client = test_app.test_client()
+    data = json.dumps({"username": "jeffrey", "email": "jeffrey@testdriven.io"})
+    resp = client.post("/users/bulk", data=data, content_type="application/json")
+
+    assert resp.status_code == 400
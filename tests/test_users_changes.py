@@ -0,0 +1,126 @@
+from datetime import datetime
+
+import pytest
+
+from src.api.users import crud
+from src.api.users.models import User, UserTombstone
+
+
+@pytest.fixture
+def feed(test_app, test_database):
+    test_database.session.query(User).delete()
+    test_database.session.query(UserTombstone).delete()
+    test_database.session.commit()
+    test_app.config["USERS_CHANGES_DELAY"] = 0
+    yield test_database
+    test_app.config["USERS_CHANGES_DELAY"] = 5
+
+
+def set_time(db, model, user_id, column, value):
+    db.session.query(model).filter_by(id=user_id).update({column: value})
+    db.session.commit()
+
+
+def test_changes_feed(test_app, feed, add_user):
+    users = [add_user(f"feed{i}", f"feed{i}@testdriven.io") for i in range(3)]
+    ids = [user.id for user in users]
+    for minute, user_id in enumerate(ids):
+        set_time(feed, User, user_id, "updated_at", datetime(2020, 1, 1, 0, minute))
+    client = test_app.test_client()
+    assert client.delete(f"/users/{ids[1]}").status_code == 200
+    set_time(feed, UserTombstone, ids[1], "deleted_at", datetime(2020, 1, 1, 1))
+
+    resp = client.get("/users/changes?limit=2")
+    data = resp.get_json()
+
+    assert resp.status_code == 200
+    assert [change["op"] for change in data["changes"]] == ["upsert", "upsert"]
+    assert [change["id"] for change in data["changes"]] == [ids[0], ids[2]]
+    assert data["changes"][0]["user"]["email"] == "feed0@testdriven.io"
+    assert data["changes"][1]["changed_at"] == "2020-01-01T00:02:00"
+    assert data["has_more"] is True
+
+    resp = client.get(f"/users/changes?limit=2&since={data['cursor']}")
+    data = resp.get_json()
+
+    assert data["changes"] == [
+        {
+            "op": "delete",
+            "id": ids[1],
+            "changed_at": "2020-01-01T01:00:00",
+            "user": None,
+        }
+    ]
+    assert data["has_more"] is False
+
+    cursor = data["cursor"]
+    resp = client.get(f"/users/changes?since={cursor}")
+    data = resp.get_json()
+
+    assert data == {"changes": [], "cursor": cursor, "has_more": False}
+
+
+def test_changes_feed_trails_the_clock(test_app, feed, add_user):
+    user = add_user("future", "future@testdriven.io")
+    set_time(feed, User, user.id, "updated_at", datetime(2999, 1, 1))
+    test_app.config["USERS_CHANGES_DELAY"] = 5
+    client = test_app.test_client()
+
+    resp = client.get("/users/changes")
+
+    assert resp.get_json() == {"changes": [], "cursor": None, "has_more": False}
+
+
+def test_changes_feed_waits_for_open_writes(test_app, feed, add_user, monkeypatch):
+    users = [add_user(f"late{i}", f"late{i}@testdriven.io") for i in range(3)]
+    ids = [user.id for user in users]
+    for minute, user_id in enumerate(ids):
+        set_time(feed, User, user_id, "updated_at", datetime(2020, 1, 1, 0, minute))
+    # The last two rows belong to a transaction that began at 00:01 and
+    # has not committed yet.
+    start = datetime(2020, 1, 1, 0, 1)
+    monkeypatch.setattr(crud, "oldest_write_start", lambda: start)
+    client = test_app.test_client()
+
+    data = client.get("/users/changes").get_json()
+
+    assert [change["id"] for change in data["changes"]] == ids[:1]
+
+    monkeypatch.setattr(crud, "oldest_write_start", lambda: None)
+    resp = client.get(f"/users/changes?since={data['cursor']}")
+
+    assert [change["id"] for change in resp.get_json()["changes"]] == ids[1:]
+
+
+def test_oldest_write_start(test_app, feed):
+    if feed.engine.dialect.name != "postgresql":
+        pytest.skip("Only PostgreSQL reports open transactions")
+    assert crud.oldest_write_start() is None
+
+    with feed.engine.connect() as connection:
+        transaction = connection.begin()
+        connection.execute(
+            User.__table__.insert(),
+            {"username": "open", "email": "open@testdriven.io"},
+        )
+        start = crud.oldest_write_start()
+        transaction.rollback()
+
+    assert start is not None
+    assert crud.changes_cutoff(0) < start
+
+
+def test_orm_deletes_leave_tombstones(test_app, feed, add_user):
+    user = add_user("orm", "orm@testdriven.io")
+    feed.session.delete(user)
+    feed.session.commit()
+
+    assert feed.session.query(UserTombstone).get(user.id) is not None
+
+
+def test_changes_feed_invalid_cursor(test_app, feed):
+    client = test_app.test_client()
+    resp = client.get("/users/changes?since=nope")
+
+    assert resp.status_code == 400
+    assert "Invalid cursor" in resp.get_json()["message"]
@@ -0,0 +1,117 @@
+import json
+from datetime import datetime, timedelta
+
+from werkzeug.http import http_date
+
+from src.api.users.models import User
+
+
+def test_single_user_etag(test_app, test_database, add_user):
+    user = add_user("etag", "etag@testdriven.io")
+    client = test_app.test_client()
+    resp = client.get(f"/users/{user.id}")
+    etag = resp.headers["ETag"]
+
+    assert resp.status_code == 200
+    assert "Last-Modified" in resp.headers
+
+    resp_two = client.get(f"/users/{user.id}", headers={"If-None-Match": etag})
+
+    assert resp_two.status_code == 304
+    assert resp_two.headers["ETag"] == etag
+    assert resp_two.data == b""
+
+
+def test_single_user_etag_changes_on_update(test_app, test_database, add_user):
+    user = add_user("before", "before@testdriven.io")
+    client = test_app.test_client()
+    etag = client.get(f"/users/{user.id}").headers["ETag"]
+    client.put(
+        f"/users/{user.id}",
+        data=json.dumps({"username": "after", "email": "after@testdriven.io"}),
+        content_type="application/json",
+    )
+    resp = client.get(f"/users/{user.id}", headers={"If-None-Match": etag})
+
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+    assert resp.get_json()["username"] == "after"
+
+
+def test_masked_user_has_its_own_etag(test_app, test_database, add_user):
+    user = add_user("masked", "masked@testdriven.io")
+    client = test_app.test_client()
+    resp = client.get(f"/users/{user.id}")
+    masked = client.get(f"/users/{user.id}", headers={"X-Fields": "id"})
+
+    assert masked.get_json() == {"id": user.id}
+    assert masked.headers["ETag"] != resp.headers["ETag"]
+    assert "X-Fields" in resp.headers["Vary"]
+    assert "X-Fields" in masked.headers["Vary"]
+
+    resp_two = client.get(
+        f"/users/{user.id}", headers={"If-None-Match": masked.headers["ETag"]}
+    )
+
+    assert resp_two.status_code == 200
+    assert resp_two.get_json()["username"] == "masked"
+
+
+def test_not_modified_matches_compressed_etag(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    for i in range(20):
+        add_user(f"gzip{i}", f"gzip{i}@testdriven.io")
+    client = test_app.test_client()
+    headers = {"Accept-Encoding": "gzip"}
+    resp = client.get("/users", headers=headers)
+
+    assert resp.headers["Content-Encoding"] == "gzip"
+
+    headers["If-None-Match"] = resp.headers["ETag"]
+    resp_two = client.get("/users", headers=headers)
+
+    assert resp_two.status_code == 304
+    assert resp_two.headers["ETag"] == resp.headers["ETag"]
+    assert "X-Fields" in resp_two.headers["Vary"]
+
+
+def test_single_user_if_modified_since(test_app, test_database, add_user):
+    user = add_user("modified", "modified@testdriven.io")
+    client = test_app.test_client()
+    last_modified = client.get(f"/users/{user.id}").headers["Last-Modified"]
+    resp = client.get(f"/users/{user.id}", headers={"If-Modified-Since": last_modified})
+
+    assert resp.status_code == 304
+
+
+def test_all_users_etag(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    add_user("jeffrey", "jeffrey@testdriven.io")
+    client = test_app.test_client()
+    etag = client.get("/users").headers["ETag"]
+    resp = client.get("/users", headers={"If-None-Match": etag})
+
+    assert resp.status_code == 304
+
+    add_user("fletcher", "fletcher@notreal.com")
+    resp_two = client.get("/users", headers={"If-None-Match": etag})
+
+    assert resp_two.status_code == 200
+    assert len(resp_two.get_json()) == 2
+
+
+def test_all_users_has_no_last_modified(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    users = [add_user(f"page{i}", f"page{i}@testdriven.io") for i in range(3)]
+    client = test_app.test_client()
+    resp = client.get("/users")
+
+    assert resp.status_code == 200
+    assert "Last-Modified" not in resp.headers
+
+    client.delete(f"/users/{users[0].id}")
+    since = http_date(datetime.utcnow() + timedelta(minutes=1))
+    resp_two = client.get("/users", headers={"If-Modified-Since": since})
+
+    assert resp_two.status_code == 200
+    assert len(resp_two.get_json()) == 2
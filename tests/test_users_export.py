@@ -0,0 +1,59 @@
+import csv
+import gzip
+import io
+import json
+
+from src.api.users.models import User
+
+
+def test_export_ndjson(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    add_user("jeffrey", "jeffrey@testdriven.io")
+    add_user("fletcher", "fletcher@notreal.com")
+    client = test_app.test_client()
+    resp = client.get("/users/export", headers={"Accept-Encoding": "identity"})
+    rows = [json.loads(line) for line in resp.data.decode().splitlines()]
+
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/x-ndjson"
+    assert [row["email"] for row in rows] == [
+        "jeffrey@testdriven.io",
+        "fletcher@notreal.com",
+    ]
+
+
+def test_export_csv(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    add_user("jeffrey", "jeffrey@testdriven.io")
+    client = test_app.test_client()
+    resp = client.get("/users/export?format=csv")
+    rows = list(csv.DictReader(io.StringIO(resp.data.decode())))
+
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/csv"
+    assert len(rows) == 1
+    assert rows[0]["username"] == "jeffrey"
+
+
+def test_export_resume_after_id(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    first = add_user("jeffrey", "jeffrey@testdriven.io")
+    add_user("fletcher", "fletcher@notreal.com")
+    client = test_app.test_client()
+    resp = client.get(f"/users/export?after_id={first.id}")
+    rows = [json.loads(line) for line in resp.data.decode().splitlines()]
+
+    assert resp.status_code == 200
+    assert [row["username"] for row in rows] == ["fletcher"]
+
+
+def test_export_gzip(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    add_user("jeffrey", "jeffrey@testdriven.io")
+    client = test_app.test_client()
+    resp = client.get("/users/export", headers={"Accept-Encoding": "gzip"})
+    rows = gzip.decompress(resp.data).decode().splitlines()
+
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert json.loads(rows[0])["username"] == "jeffrey"
@@ -0,0 +1,51 @@
+import json
+
+from sqlalchemy import event
+
+from src.api.users.models import User
+
+
+def test_list_fields(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    add_user("jeffrey", "jeffrey@testdriven.io")
+    add_user("fletcher", "fletcher@notreal.com")
+    client = test_app.test_client()
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(test_database.engine, "before_cursor_execute", record)
+    try:
+        resp = client.get("/users?fields=email,id&limit=1")
+    finally:
+        event.remove(test_database.engine, "before_cursor_execute", record)
+    data = json.loads(resp.data.decode())
+
+    assert resp.status_code == 200
+    assert data == [{"id": data[0]["id"], "email": "jeffrey@testdriven.io"}]
+    assert "fields=email%2Cid" in resp.headers["Link"]
+    assert "ETag" in resp.headers
+    assert not any("users.username" in s for s in statements)
+
+
+def test_single_user_fields(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    user = add_user("jeffrey", "jeffrey@testdriven.io")
+    client = test_app.test_client()
+    resp = client.get(f"/users/{user.id}?fields=username")
+    data = json.loads(resp.data.decode())
+
+    assert resp.status_code == 200
+    assert data == {"username": "jeffrey"}
+    assert resp.headers["ETag"] == f'W/"{user.id}-1"'
+
+
+def test_unknown_fields(test_app, test_database):
+    client = test_app.test_client()
+    resp = client.get("/users?fields=id,password")
+    data = json.loads(resp.data.decode())
+
+    assert resp.status_code == 400
+    assert "Unknown fields: password" in json.dumps(data)
+    assert client.get("/users/1?fields=,").status_code == 400
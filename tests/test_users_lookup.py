@@ -0,0 +1,59 @@
+import json
+
+from src.api.users.models import User
+
+
+def _lookup(client, ids):
+    return client.post(
+        "/users/lookup",
+        data=json.dumps({"ids": ids}),
+        content_type="application/json",
+    )
+
+
+def test_lookup_keeps_order_and_reports_missing(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    first = add_user("jeffrey", "jeffrey@testdriven.io")
+    second = add_user("fletcher", "fletcher@notreal.com")
+    client = test_app.test_client()
+    resp = _lookup(client, [second.id, 999999, first.id, second.id])
+    data = json.loads(resp.data.decode())
+
+    assert resp.status_code == 200
+    assert [user["username"] for user in data["users"]] == [
+        "fletcher",
+        "jeffrey",
+    ]
+    assert data["missing"] == [999999]
+    assert set(data["users"][0]) == {"id", "username", "email", "created_date"}
+
+
+def test_lookup_uses_cached_users(test_app, test_database, add_user):
+    test_database.session.query(User).delete()
+    user = add_user("jeffrey", "jeffrey@testdriven.io")
+    client = test_app.test_client()
+    client.get(f"/users/{user.id}")
+    resp = _lookup(client, [user.id])
+    data = json.loads(resp.data.decode())
+
+    assert data["users"][0]["email"] == "jeffrey@testdriven.io"
+    assert data["missing"] == []
+
+
+def test_lookup_invalid_ids(test_app, test_database):
+    client = test_app.test_client()
+
+    assert _lookup(client, ["1"]).status_code == 400
+    assert _lookup(client, [True]).status_code == 400
+    resp = client.post("/users/lookup", data="[1]", content_type="application/json")
+    assert resp.status_code == 400
+
+
+def test_lookup_too_many_ids(test_app, test_database):
+    test_app.config["USERS_LOOKUP_MAX_IDS"] = 2
+    try:
+        resp = _lookup(test_app.test_client(), [1, 2, 3])
+    finally:
+        test_app.config["USERS_LOOKUP_MAX_IDS"] = 1000
+
+    assert resp.status_code == 400
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from src import db
+from src.api.users import crud
+from src.api.users.models import User
+
+
+def _seed(add_user):
+    db.session.query(User).delete()
+    db.session.commit()
+    add_user("annabel", "bel@example.com")
+    add_user("ann", "ann@testdriven.io")
+    add_user("joanna", "jo@example.com")
+    add_user("bob", "annie@example.com")
+    add_user("zed", "zed@example.com")
+
+
+def test_search_ranks_exact_then_prefixes(test_app, test_database, add_user):
+    _seed(add_user)
+    client = test_app.test_client()
+    resp = client.get("/users/search?q=Ann")
+    data = json.loads(resp.data.decode())
+
+    assert resp.status_code == 200
+    assert [user["username"] for user in data] == [
+        "ann",
+        "annabel",
+        "bob",
+        "joanna",
+    ]
+
+
+def test_search_limit(test_app, test_database, add_user):
+    _seed(add_user)
+    client = test_app.test_client()
+    resp = client.get("/users/search?q=ann&limit=2")
+    data = json.loads(resp.data.decode())
+
+    assert [user["username"] for user in data] == ["ann", "annabel"]
+
+
+def test_search_escapes_wildcards(test_app, test_database, add_user):
+    _seed(add_user)
+    add_user("under_score", "us@example.com")
+
+    users = crud.search_users("r_s", limit=10)
+    assert [user.username for user in users] == ["under_score"]
+    assert crud.search_users("%", limit=10) == []
+
+
+def test_search_ending_in_highest_code_point(test_app, test_database, add_user):
+    _seed(add_user)
+    add_user("max\U0010ffff", "max@example.com")
+    client = test_app.test_client()
+
+    assert client.get("/users/search?q=%F4%8F%BF%BF").status_code == 200
+    users = crud.search_users("max\U0010ffff", limit=10)
+    assert [user.username for user in users] == ["max\U0010ffff"]
+
+
+def test_search_requires_query(test_app, test_database):
+    client = test_app.test_client()
+
+    assert client.get("/users/search").status_code == 400
+    assert client.get("/users/search?q=%20").status_code == 400
+
+
+def test_search_prefix_uses_index(test_app, test_database):
+    if db.engine.dialect.name != "sqlite":
+        pytest.skip("PostgreSQL searches through trigram indexes")
+    plan = db.session.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM users "
+        "WHERE lower(username) >= 'ann' AND lower(username) < 'ano'"
+    ).fetchall()
+
+    assert "ix_users_username_lower" in str(plan)
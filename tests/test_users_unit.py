@@ -7,13 +7,9 @@ from src.api.users import crud
 
 
 def test_add_user(test_app, monkeypatch):
-    def mock_get_user_by_email(email):
-        return None
-
     def mock_add_user(username, email):
         return True
 
-    monkeypatch.setattr(crud, "get_user_by_email", mock_get_user_by_email)
     monkeypatch.setattr(crud, "add_user", mock_add_user)
 
     client = test_app.test_client()
@@ -46,13 +42,9 @@ def test_add_user_invalid_json_keys(test_app):
 
 
 def test_add_user_duplicate_email(test_app, monkeypatch):
-    def mock_get_user_by_email(email):
-        return True
-
     def mock_add_user(username, email):
-        return True
+        raise crud.DuplicateEmailError(email)
 
-    monkeypatch.setattr(crud, "get_user_by_email", mock_get_user_by_email)
     monkeypatch.setattr(crud, "add_user", mock_add_user)
 
     client = test_app.test_client()
@@ -66,7 +58,7 @@ def test_add_user_duplicate_email(test_app, monkeypatch):
 
 
 def test_single_user(test_app, monkeypatch):
-    def mock_get_user_by_id(user_id):
+    def mock_get_user_by_id(user_id, fields=None):
         return {
             "id": 1,
             "username": "jeffrey",
@@ -86,7 +78,7 @@ def test_single_user(test_app, monkeypatch):
 
 
 def test_single_user_incorrect_id(test_app, monkeypatch):
-    def mock_get_user_by_id(user_id):
+    def mock_get_user_by_id(user_id, fields=None):
         return None
 
     monkeypatch.setattr(crud, "get_user_by_id", mock_get_user_by_id)
@@ -100,7 +92,7 @@ def test_single_user_incorrect_id(test_app, monkeypatch):
 
 
 def test_all_users(test_app, monkeypatch):
-    def mock_get_all_users():
+    def mock_get_all_users(**kwargs):
         return [
             {
                 "id": 1,
@@ -133,16 +125,13 @@ def test_all_users(test_app, monkeypatch):
 
 
 def test_remove_user(test_app, monkeypatch):
-    def mock_get_user_by_id(user_id):
-        d = SimpleNamespace(
-            id=1, username="user-to-be-removed", email="remove-me@testdriven.io"
-        )
-        return d
-
-    def mock_delete_user(user):
-        return True
+    def mock_delete_user(user_id):
+        return {
+            "id": 1,
+            "username": "user-to-be-removed",
+            "email": "remove-me@testdriven.io",
+        }
 
-    monkeypatch.setattr(crud, "get_user_by_id", mock_get_user_by_id)
     monkeypatch.setattr(crud, "delete_user", mock_delete_user)
 
     client = test_app.test_client()
@@ -154,10 +143,10 @@ def test_remove_user(test_app, monkeypatch):
 
 
 def test_remove_user_incorrect_id(test_app, monkeypatch, add_user):
-    def mock_get_user_by_id(user_id):
+    def mock_delete_user(user_id):
         return None
 
-    monkeypatch.setattr(crud, "get_user_by_id", mock_get_user_by_id)
+    monkeypatch.setattr(crud, "delete_user", mock_delete_user)
 
     client = test_app.test_client()
     resp = client.delete("users/999")
@@ -168,7 +157,7 @@ def test_remove_user_incorrect_id(test_app, monkeypatch, add_user):
 
 
 def test_update_user(test_app, monkeypatch):
-    def mock_get_user_by_id(user_id):
+    def mock_get_user_by_id(user_id, fields=None):
         d = SimpleNamespace(
             id=1,
             username="me",
@@ -176,15 +165,11 @@ def test_update_user(test_app, monkeypatch):
         )
         return d
 
-    def mock_update_user(user, username, email):
-        return True
-
-    def mock_get_user_by_email(email):
-        return None
+    def mock_update_user(user_id, **values):
+        return {"id": user_id, **values}
 
     monkeypatch.setattr(crud, "get_user_by_id", mock_get_user_by_id)
     monkeypatch.setattr(crud, "update_user", mock_update_user)
-    monkeypatch.setattr(crud, "get_user_by_email", mock_get_user_by_email)
 
     client = test_app.test_client()
     resp = client.put(
@@ -223,10 +208,10 @@ update_user_invalid_cases = [
 def test_update_user_invalid(
     test_app, monkeypatch, user_id, payload, status_code, message
 ):
-    def mock_get_user_by_id(user_id):
+    def mock_update_user(user_id, **values):
         return None
 
-    monkeypatch.setattr(crud, "get_user_by_id", mock_get_user_by_id)
+    monkeypatch.setattr(crud, "update_user", mock_update_user)
 
     client = test_app.test_client()
     resp = client.put(
@@ -239,22 +224,9 @@ def test_update_user_invalid(
 
 
 def test_update_user_duplicate_email(test_app, monkeypatch):
-    def mock_get_user_by_id(user_id):
-        d = SimpleNamespace(
-            id=1,
-            username="me",
-            email="me@testdriven.io",
-        )
-        return d
-
-    def mock_update_user(user, username, email):
-        return True
-
-    def mock_get_user_by_email(email):
-        return True
+    def mock_update_user(user_id, **values):
+        raise crud.DuplicateEmailError(values["email"])
 
-    monkeypatch.setattr(crud, "get_user_by_id", mock_get_user_by_id)
-    monkeypatch.setattr(crud, "get_user_by_email", mock_get_user_by_email)
     monkeypatch.setattr(crud, "update_user", mock_update_user)
 
     client = test_app.test_client()
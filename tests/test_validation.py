@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from flask_restx import fields
+from jsonschema import Draft4Validator
+
+from src.api.users.views import lookup_request, user, user_patch
+from src.api.validation import CompiledModel, compile_validator
+
+payloads = [
+    {"username": "me", "email": "me@testdriven.io"},
+    {"username": "me", "email": "me@testdriven.io", "id": 1},
+    {"username": "me", "email": "me@testdriven.io", "id": True},
+    {"username": "me", "email": "me@testdriven.io", "id": 1.0},
+    {"username": "me", "email": None},
+    {"username": "me"},
+    {"email": 1},
+    {"ids": [1, 2, 3]},
+    {"ids": [1, "2"]},
+    {"ids": []},
+    {"ids": None},
+    {"status": "created"},
+    {"status": "gone"},
+    {"extra": 1},
+    {},
+    [],
+    None,
+    "me",
+]
+
+strict = CompiledModel(
+    "Strict",
+    {
+        "name": fields.String(required=True, min_length=2, max_length=4),
+        "status": fields.String(enum=("created", "gone")),
+        "flag": fields.Boolean,
+        "score": fields.Float,
+    },
+    strict=True,
+)
+
+
+@pytest.mark.parametrize("model", [user, user_patch, lookup_request, strict])
+@pytest.mark.parametrize("payload", payloads)
+def test_compiled_validator_agrees_with_jsonschema(model, payload):
+    validate = compile_validator(model.__schema__)
+    valid = Draft4Validator(model.__schema__).is_valid(payload)
+
+    assert validate(payload) == valid
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"name": "abc", "status": "gone", "flag": False, "score": 1},
+        {"name": "a"},
+        {"name": "abcde"},
+        {"name": "abc", "score": "1"},
+        {"name": "abc", "flag": 0},
+        {"name": "abc", "unknown": 1},
+    ],
+)
+def test_strict_model_agrees_with_jsonschema(payload):
+    validate = compile_validator(strict.__schema__)
+    valid = Draft4Validator(strict.__schema__).is_valid(payload)
+
+    assert validate(payload) == valid
+
+
+def test_references_are_not_compiled():
+    schema = {
+        "type": "object",
+        "properties": {"user": {"$ref": "#/definitions/User"}},
+    }
+    assert compile_validator(schema) is None
+
+
+def test_invalid_payload_keeps_field_errors(test_app, test_database):
+    client = test_app.test_client()
+    resp = client.post(
+        "/users",
+        data=json.dumps({"email": 1}),
+        content_type="application/json",
+    )
+    data = resp.get_json()
+
+    assert resp.status_code == 400
+    assert data["message"] == "Input payload validation failed"
+    assert data["errors"] == {
+        "email": "1 is not of type 'string'",
+        "username": "'username' is a required property",
+    }